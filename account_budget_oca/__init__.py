@@ -1,3 +1,23 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from . import controllers
 from . import models
+from . import report
+from . import wizard
+from .models.account_budget import _ACTUALS_INDEXES, _DATE_RANGE_INDEX
+
+
+def uninstall_hook(cr, registry):
+    """Drop what the removal of the models leaves behind: the materialized
+    views, the function they use and the indexes of the actuals queries on
+    the journal tables.
+    """
+    for view in ('crossovered_budget_group_report',
+                 'crossovered_budget_report',
+                 'account_budget_daily_actual'):
+        cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s" % view)
+    cr.execute("DROP FUNCTION IF EXISTS account_budget_curve_position("
+               "text, timestamp)")
+    for name in [index[0] for index in _ACTUALS_INDEXES] + [
+            _DATE_RANGE_INDEX]:
+        cr.execute("DROP INDEX IF EXISTS %s" % name)
@@ -2,7 +2,7 @@
 
 {
     'name': 'Budgets Management',
-    'version': '12.0.1.1.0',
+    'version': '12.0.1.2.0',
     'category': 'Accounting',
     'license': 'LGPL-3',
     'author': 'Odoo S.A., '
@@ -13,9 +13,17 @@
     'data': [
         'security/ir.model.access.csv',
         'security/account_budget_security.xml',
+        'data/ir_cron_data.xml',
+        'wizard/crossovered_budget_lines_import_views.xml',
+        'wizard/crossovered_budget_roll_forward_views.xml',
         'views/account_analytic_account_views.xml',
         'views/account_budget_views.xml',
         'views/res_config_settings_views.xml',
+        'views/crossovered_budget_stat_views.xml',
+        'views/account_budget_spread_profile_views.xml',
+        'report/crossovered_budget_report_views.xml',
+        'report/crossovered_budget_group_report_views.xml',
     ],
     'demo': ['data/account_budget_demo.xml'],
+    'uninstall_hook': 'uninstall_hook',
 }
@@ -0,0 +1,35 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import tempfile
+
+from odoo import http
+from odoo.http import request
+
+_MIMETYPES = {
+    'csv': 'text/csv;charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.'
+            'spreadsheetml.sheet',
+}
+
+
+class BudgetExportController(http.Controller):
+
+    @http.route('/account_budget_oca/export/<int:budget_id>/<string:fmt>',
+                type='http', auth='user')
+    def export_budget_lines(self, budget_id, fmt, **kwargs):
+        """Stream the lines of a budget with their amounts. The file is
+        built on disk, then sent by chunks, so that large budgets never
+        have to fit in memory.
+        """
+        if fmt not in _MIMETYPES:
+            return request.not_found()
+        budget = request.env['crossovered.budget'].browse(budget_id)
+        # The lines are read with SQL: check the access to the budget first
+        budget.check_access_rights('read')
+        budget.check_access_rule('read')
+        fileobj = tempfile.TemporaryFile()
+        budget._export_lines(fileobj, fmt)
+        fileobj.seek(0)
+        return http.send_file(
+            fileobj, filename='%s.%s' % (budget.name, fmt),
+            mimetype=_MIMETYPES[fmt], as_attachment=True)
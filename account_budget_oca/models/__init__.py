@@ -2,3 +2,10 @@
 
 from . import account_budget
 from . import account_analytic_account
+from . import account_move
+from . import account_move_line
+from . import account_analytic_line
+from . import res_config_settings
+from . import account_budget_daily_actual
+from . import crossovered_budget_stat
+from . import account_budget_spread_profile
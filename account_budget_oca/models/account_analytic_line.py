@@ -0,0 +1,34 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+# Fields of an analytic line that are summed up in the budget actuals
+_ACTUALS_FIELDS = {'account_id', 'general_account_id', 'date', 'amount'}
+
+
+class AccountAnalyticLine(models.Model):
+    _inherit = "account.analytic.line"
+
+    @api.model
+    def _create(self, data_list):
+        records = super(AccountAnalyticLine, self)._create(data_list)
+        self.env['crossovered.budget.lines']._apply_analytic_line_actuals(
+            records.ids, 1)
+        return records
+
+    @api.multi
+    def _write(self, vals):
+        budget_line_obj = self.env['crossovered.budget.lines']
+        tracked = bool(_ACTUALS_FIELDS.intersection(vals))
+        if tracked:
+            budget_line_obj._apply_analytic_line_actuals(self.ids, -1)
+        res = super(AccountAnalyticLine, self)._write(vals)
+        if tracked:
+            budget_line_obj._apply_analytic_line_actuals(self.ids, 1)
+        return res
+
+    @api.multi
+    def unlink(self):
+        self.env['crossovered.budget.lines']._apply_analytic_line_actuals(
+            self.ids, -1)
+        return super(AccountAnalyticLine, self).unlink()
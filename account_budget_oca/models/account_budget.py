@@ -1,10 +1,496 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import api, fields, models, _
-from odoo.exceptions import ValidationError
+import csv
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import split_every
+from odoo.tools.sql import index_exists
+
+from .budget_forecast import history_window, month_index, project_landing
+from .budget_profiling import profiled, record_rows
+from .budget_spread import CURVE_POSITION_FUNCTION, curve_position
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import xlsxwriter
+except ImportError:
+    _logger.debug('Cannot import xlsxwriter')
+    xlsxwriter = None
 
 from_string = fields.Datetime.from_string
 
+# Indexes matching the actuals queries: (name, table, key columns, columns
+# only needed for index-only scans)
+_ACTUALS_INDEXES = [
+    ('account_move_line_budget_actuals_index', 'account_move_line',
+     ['account_id', 'date'], ['debit', 'credit']),
+    ('account_analytic_line_budget_actuals_index', 'account_analytic_line',
+     ['account_id', 'general_account_id', 'date'], ['amount']),
+]
+
+# Row of the VALUES list describing the budget lines whose actuals are
+# computed: (key, analytic_account_id, date_from, date_to, account_ids). The
+# actuals queries return the key, the amount and the number of rows summed.
+_ACTUALS_VALUES_ROW = '(%s, %s::integer, %s::date, %s::date, %s::integer[])'
+
+_ANALYTIC_ACTUALS_QUERY = """
+    SELECT budget_line.key, SUM(aal.amount), COUNT(*)
+    FROM (VALUES %s) AS budget_line(
+        key, analytic_account_id, date_from, date_to, account_ids)
+    JOIN account_analytic_line aal
+        ON aal.account_id = budget_line.analytic_account_id
+        AND (aal.date BETWEEN budget_line.date_from
+            AND budget_line.date_to)
+        AND aal.general_account_id = ANY(budget_line.account_ids)
+    GROUP BY budget_line.key"""
+
+_GENERAL_ACTUALS_QUERY = """
+    SELECT budget_line.key, SUM(aml.credit - aml.debit), COUNT(*)
+    FROM (VALUES %s) AS budget_line(
+        key, analytic_account_id, date_from, date_to, account_ids)
+    JOIN account_move_line aml
+        ON (aml.date BETWEEN budget_line.date_from
+            AND budget_line.date_to)
+        AND aml.account_id = ANY(budget_line.account_ids)
+    GROUP BY budget_line.key"""
+
+# Actuals read from the running sums of account.budget.daily.actual: the
+# total up to date_to minus the total before date_from, for each account
+_SUMMARY_ACTUALS_QUERY = """
+    SELECT budget_line.key, SUM(
+        COALESCE(upper_sum.cumulative_amount, 0.0) -
+        COALESCE(lower_sum.cumulative_amount, 0.0)),
+        COUNT(upper_sum.cumulative_amount) +
+        COUNT(lower_sum.cumulative_amount)
+    FROM (VALUES %%s) AS budget_line(
+        key, analytic_account_id, date_from, date_to, account_ids)
+    CROSS JOIN LATERAL unnest(budget_line.account_ids) AS account(id)
+    LEFT JOIN LATERAL (
+        SELECT daily.cumulative_amount
+        FROM account_budget_daily_actual daily
+        WHERE daily.account_id = account.id
+            AND daily.analytic_account_id %(analytic_clause)s
+            AND daily.date <= budget_line.date_to
+        ORDER BY daily.date DESC
+        LIMIT 1
+    ) AS upper_sum ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT daily.cumulative_amount
+        FROM account_budget_daily_actual daily
+        WHERE daily.account_id = account.id
+            AND daily.analytic_account_id %(analytic_clause)s
+            AND daily.date < budget_line.date_from
+        ORDER BY daily.date DESC
+        LIMIT 1
+    ) AS lower_sum ON TRUE
+    GROUP BY budget_line.key"""
+
+_ANALYTIC_SUMMARY_QUERY = _SUMMARY_ACTUALS_QUERY % {
+    'analytic_clause': '= budget_line.analytic_account_id'}
+
+_GENERAL_SUMMARY_QUERY = _SUMMARY_ACTUALS_QUERY % {
+    'analytic_clause': 'IS NULL'}
+
+# Monthly actuals of the budget lines over the history window of the forecast
+_ANALYTIC_HISTORY_QUERY = """
+    SELECT budget_line.key, date_trunc('month', aal.date)::date,
+        SUM(aal.amount), COUNT(*)
+    FROM (VALUES %s) AS budget_line(
+        key, analytic_account_id, date_from, date_to, account_ids)
+    JOIN account_analytic_line aal
+        ON aal.account_id = budget_line.analytic_account_id
+        AND (aal.date BETWEEN budget_line.date_from
+            AND budget_line.date_to)
+        AND aal.general_account_id = ANY(budget_line.account_ids)
+    GROUP BY budget_line.key, date_trunc('month', aal.date)"""
+
+_GENERAL_HISTORY_QUERY = """
+    SELECT budget_line.key, date_trunc('month', aml.date)::date,
+        SUM(aml.credit - aml.debit), COUNT(*)
+    FROM (VALUES %s) AS budget_line(
+        key, analytic_account_id, date_from, date_to, account_ids)
+    JOIN account_move_line aml
+        ON (aml.date BETWEEN budget_line.date_from
+            AND budget_line.date_to)
+        AND aml.account_id = ANY(budget_line.account_ids)
+    GROUP BY budget_line.key, date_trunc('month', aml.date)"""
+
+# Cash-basis actuals: the amounts of the moves settled by a payment are
+# counted at the date of their reconciliations, pro rata of the reconciled
+# part of their receivable and payable items. The amounts of the other moves
+# are counted at their own date. %(item_query)s lists the amounts that may
+# count for each line, with their move and date.
+_CASH_ACTUALS_QUERY = """
+    WITH item AS (%(item_query)s
+    ), term AS (
+        SELECT term_line.move_id, term_line.id AS line_id,
+            SUM(ABS(term_line.balance)) OVER (
+                PARTITION BY term_line.move_id) AS move_total
+        FROM account_move_line term_line
+        JOIN account_account account ON account.id = term_line.account_id
+        WHERE account.internal_type IN ('receivable', 'payable')
+            AND term_line.move_id IN (SELECT move_id FROM item)
+    ), payment AS (
+        SELECT term.move_id, apr.max_date AS date,
+            SUM(apr.amount / NULLIF(term.move_total, 0.0)) AS ratio
+        FROM term
+        JOIN account_partial_reconcile apr
+            ON term.line_id IN (apr.debit_move_id, apr.credit_move_id)
+        GROUP BY term.move_id, apr.max_date
+    )
+    SELECT cash.key, SUM(cash.amount), COUNT(*)
+    FROM (
+        SELECT item.key, item.amount * payment.ratio AS amount
+        FROM item
+        JOIN payment ON payment.move_id = item.move_id
+            AND (payment.date BETWEEN item.date_from AND item.date_to)
+        UNION ALL
+        SELECT item.key, item.amount
+        FROM item
+        WHERE (item.date BETWEEN item.date_from AND item.date_to)
+            AND NOT EXISTS (
+                SELECT 1 FROM term WHERE term.move_id = item.move_id)
+    ) AS cash
+    GROUP BY cash.key"""
+
+# Reconciliations are never older than the item they settle: items dated
+# after the end of a line cannot count for it
+_ANALYTIC_CASH_QUERY = _CASH_ACTUALS_QUERY % {'item_query': """
+        SELECT budget_line.key, budget_line.date_from, budget_line.date_to,
+            aml.move_id, aal.date, aal.amount
+        FROM (VALUES %s) AS budget_line(
+            key, analytic_account_id, date_from, date_to, account_ids)
+        JOIN account_analytic_line aal
+            ON aal.account_id = budget_line.analytic_account_id
+            AND aal.date <= budget_line.date_to
+            AND aal.general_account_id = ANY(budget_line.account_ids)
+        LEFT JOIN account_move_line aml ON aml.id = aal.move_id"""}
+
+_GENERAL_CASH_QUERY = _CASH_ACTUALS_QUERY % {'item_query': """
+        SELECT budget_line.key, budget_line.date_from, budget_line.date_to,
+            aml.move_id, aml.date, aml.credit - aml.debit AS amount
+        FROM (VALUES %s) AS budget_line(
+            key, analytic_account_id, date_from, date_to, account_ids)
+        JOIN account_move_line aml
+            ON aml.date <= budget_line.date_to
+            AND aml.account_id = ANY(budget_line.account_ids)"""}
+
+# Cash-basis actuals of every line of the cash-basis budgets
+_LINE_CASH_ACTUALS_QUERY = _CASH_ACTUALS_QUERY % {'item_query': """
+        SELECT bl.id AS key, bl.date_from, bl.date_to,
+            aml.move_id, aal.date, aal.amount
+        FROM crossovered_budget_lines bl
+        JOIN crossovered_budget budget
+            ON budget.id = bl.crossovered_budget_id
+        JOIN account_budget_rel rel ON rel.budget_id = bl.general_budget_id
+        JOIN account_analytic_line aal
+            ON aal.account_id = bl.analytic_account_id
+            AND aal.general_account_id = rel.account_id
+            AND aal.date <= bl.date_to
+        LEFT JOIN account_move_line aml ON aml.id = aal.move_id
+        WHERE budget.actuals_basis = 'cash'
+        UNION ALL
+        SELECT bl.id, bl.date_from, bl.date_to,
+            aml.move_id, aml.date, aml.credit - aml.debit
+        FROM crossovered_budget_lines bl
+        JOIN crossovered_budget budget
+            ON budget.id = bl.crossovered_budget_id
+        JOIN account_budget_rel rel ON rel.budget_id = bl.general_budget_id
+        JOIN account_move_line aml ON aml.account_id = rel.account_id
+            AND aml.date <= bl.date_to
+        WHERE bl.analytic_account_id IS NULL
+            AND budget.actuals_basis = 'cash'"""}
+
+# Actuals of every line of the accrual-basis budgets, from the journal
+_LINE_ACCRUAL_ACTUALS_QUERY = """
+        SELECT bl.id AS line_id, SUM(aml.credit - aml.debit) AS amount
+        FROM crossovered_budget_lines bl
+        JOIN crossovered_budget budget
+            ON budget.id = bl.crossovered_budget_id
+        JOIN account_budget_rel rel ON rel.budget_id = bl.general_budget_id
+        JOIN account_move_line aml ON aml.account_id = rel.account_id
+            AND (aml.date BETWEEN bl.date_from AND bl.date_to)
+        WHERE bl.analytic_account_id IS NULL
+            AND budget.actuals_basis = 'accrual'
+        GROUP BY bl.id
+        UNION ALL
+        SELECT bl.id AS line_id, SUM(aal.amount) AS amount
+        FROM crossovered_budget_lines bl
+        JOIN crossovered_budget budget
+            ON budget.id = bl.crossovered_budget_id
+        JOIN account_budget_rel rel ON rel.budget_id = bl.general_budget_id
+        JOIN account_analytic_line aal
+            ON aal.account_id = bl.analytic_account_id
+            AND aal.general_account_id = rel.account_id
+            AND (aal.date BETWEEN bl.date_from AND bl.date_to)
+        WHERE budget.actuals_basis = 'accrual'
+        GROUP BY bl.id"""
+
+# Same, from the stored practical amounts, in the stored actuals mode
+_LINE_STORED_ACTUALS_QUERY = """
+        SELECT bl.id AS line_id, bl.stored_practical_amount AS amount
+        FROM crossovered_budget_lines bl
+        JOIN crossovered_budget budget
+            ON budget.id = bl.crossovered_budget_id
+        WHERE budget.actuals_basis = 'accrual'"""
+
+# Practical and theoretical amounts of every budget line, computed in the
+# database, for reporting and searching: frozen lines use their snapshot, the
+# others are spread along their profile like in _prorata_amounts and follow
+# the actuals basis of their budget. %(accrual_query)s gives the actuals of
+# the accrual-basis lines.
+_LINE_AMOUNTS_TEMPLATE = """
+    SELECT bl.id AS line_id,
+        CASE WHEN bl.snapshot_date IS NOT NULL AND budget.state = 'done'
+            THEN bl.snapshot_practical_amount
+            ELSE COALESCE(actual.amount, 0.0)
+        END AS practical_amount,
+        CASE WHEN bl.snapshot_date IS NOT NULL AND budget.state = 'done'
+            THEN bl.snapshot_theoretical_amount
+            WHEN bl.paid_date IS NOT NULL THEN
+                CASE WHEN bl.date_to <= bl.paid_date THEN 0.0
+                    ELSE bl.planned_amount END
+            WHEN now() AT TIME ZONE 'UTC' < bl.date_from THEN 0.0
+            WHEN bl.date_to > bl.date_from
+                AND now() AT TIME ZONE 'UTC' < bl.date_to THEN
+                bl.planned_amount * COALESCE(
+                    (account_budget_curve_position(
+                        profile.curve, now() AT TIME ZONE 'UTC')
+                     - account_budget_curve_position(
+                        profile.curve, bl.date_from)) / NULLIF(
+                        account_budget_curve_position(
+                            profile.curve, bl.date_to)
+                        - account_budget_curve_position(
+                            profile.curve, bl.date_from), 0.0),
+                    EXTRACT(EPOCH FROM
+                        now() AT TIME ZONE 'UTC' - bl.date_from::timestamp) /
+                    ((bl.date_to - bl.date_from) * 86400.0))
+            ELSE bl.planned_amount
+        END AS theoretical_amount
+    FROM crossovered_budget_lines bl
+    JOIN crossovered_budget budget ON budget.id = bl.crossovered_budget_id
+    JOIN account_budget_post post ON post.id = bl.general_budget_id
+    LEFT JOIN account_budget_spread_profile profile ON profile.id = COALESCE(
+        bl.spread_profile_id, post.spread_profile_id)
+    LEFT JOIN (%(accrual_query)s
+        UNION ALL
+        SELECT line_cash.line_id, line_cash.amount
+        FROM (%(cash_query)s
+        ) AS line_cash(line_id, amount, row_count)
+    ) AS actual ON actual.line_id = bl.id"""
+
+_LINE_AMOUNTS_QUERY = _LINE_AMOUNTS_TEMPLATE % {
+    'accrual_query': _LINE_ACCRUAL_ACTUALS_QUERY,
+    'cash_query': _LINE_CASH_ACTUALS_QUERY}
+
+_STORED_LINE_AMOUNTS_QUERY = _LINE_AMOUNTS_TEMPLATE % {
+    'accrual_query': _LINE_STORED_ACTUALS_QUERY,
+    'cash_query': _LINE_CASH_ACTUALS_QUERY}
+
+# Same, with the achievement of the lines, %s being one of the above
+_LINE_PERCENTAGE_QUERY = """
+    SELECT amounts.*,
+        CASE WHEN amounts.theoretical_amount <> 0.0
+            THEN amounts.practical_amount / amounts.theoretical_amount * 100
+            ELSE 0.0
+        END AS percentage
+    FROM (%s) AS amounts"""
+
+# Operators supported when searching on the computed amounts
+_SEARCH_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+# Columns filled by CrossoveredBudgetLines._bulk_create, planned_amount last
+_BULK_CREATE_COLUMNS = [
+    'crossovered_budget_id', 'general_budget_id', 'analytic_account_id',
+    'date_from', 'date_to', 'paid_date', 'spread_profile_id',
+    'planned_amount',
+]
+_BULK_CREATE_ROW = (
+    '(%s::integer, %s::integer, %s::integer, %s::date, %s::date, %s::date, '
+    '%s::integer, %s::numeric)')
+
+# Start of the refresh of the stored actuals in progress
+_REFRESH_START_PARAM = 'account_budget_oca.actuals_refresh_start'
+
+# Fields of a budget line that decide which journal items it covers
+_ACTUALS_KEY_FIELDS = {
+    'analytic_account_id', 'general_budget_id', 'date_from', 'date_to',
+}
+
+_MOVE_LINE_DELTA_QUERY = """
+    SELECT budget_line.id AS line_id, SUM(aml.credit - aml.debit) AS amount
+    FROM account_move_line aml
+    JOIN account_budget_rel rel ON rel.account_id = aml.account_id
+    JOIN crossovered_budget_lines budget_line
+        ON budget_line.general_budget_id = rel.budget_id
+        AND budget_line.analytic_account_id IS NULL
+        AND daterange(
+            LEAST(budget_line.date_from, budget_line.date_to),
+            GREATEST(budget_line.date_from, budget_line.date_to), '[]')
+            @> aml.date
+    WHERE aml.id IN %s
+    GROUP BY budget_line.id"""
+
+_ANALYTIC_LINE_DELTA_QUERY = """
+    SELECT budget_line.id AS line_id, SUM(aal.amount) AS amount
+    FROM account_analytic_line aal
+    JOIN account_budget_rel rel ON rel.account_id = aal.general_account_id
+    JOIN crossovered_budget_lines budget_line
+        ON budget_line.general_budget_id = rel.budget_id
+        AND budget_line.analytic_account_id = aal.account_id
+        AND daterange(
+            LEAST(budget_line.date_from, budget_line.date_to),
+            GREATEST(budget_line.date_from, budget_line.date_to), '[]')
+            @> aal.date
+    WHERE aal.id IN %s
+    GROUP BY budget_line.id"""
+
+
+# Budget lines covering each journal item: the general lines of the
+# budgetary positions of its account, and the lines of its analytic account,
+# whose period contains its date (found with _DATE_RANGE_INDEX)
+_COVERING_LINES_QUERY = """
+    SELECT aml.id, array_agg(budget_line.id ORDER BY budget_line.id)
+    FROM account_move_line aml
+    JOIN account_budget_rel rel ON rel.account_id = aml.account_id
+    JOIN crossovered_budget_lines budget_line
+        ON budget_line.general_budget_id = rel.budget_id
+        AND daterange(
+            LEAST(budget_line.date_from, budget_line.date_to),
+            GREATEST(budget_line.date_from, budget_line.date_to), '[]')
+            @> aml.date
+        AND (budget_line.analytic_account_id IS NULL
+            OR budget_line.analytic_account_id = aml.analytic_account_id)
+    WHERE aml.id IN %s
+    GROUP BY aml.id"""
+
+# Budget lines under control of running budgets covering the journal items of
+# moves, with the amount the moves add to each of them
+_CONTROLLED_LINES_QUERY = """
+    SELECT budget_line.id, SUM(aml.credit - aml.debit)
+    FROM account_move_line aml
+    JOIN account_budget_rel rel ON rel.account_id = aml.account_id
+    JOIN account_budget_post post ON post.id = rel.budget_id
+        AND post.budget_control IN ('warning', 'block')
+    JOIN crossovered_budget_lines budget_line
+        ON budget_line.general_budget_id = post.id
+        AND daterange(
+            LEAST(budget_line.date_from, budget_line.date_to),
+            GREATEST(budget_line.date_from, budget_line.date_to), '[]')
+            @> aml.date
+        AND (budget_line.analytic_account_id IS NULL
+            OR budget_line.analytic_account_id = aml.analytic_account_id)
+    JOIN crossovered_budget budget
+        ON budget.id = budget_line.crossovered_budget_id
+        AND budget.state IN ('confirm', 'validate')
+    WHERE aml.move_id IN %s
+    GROUP BY budget_line.id"""
+
+# Interval index answering which budget lines cover a date. Its bounds are
+# ordered so that lines saved with inverted dates cannot break its build.
+_DATE_RANGE_INDEX = 'crossovered_budget_lines_date_range_index'
+
+# Budget lines streamed by CrossoveredBudget._export_lines, with the labels
+# of their relations so that no record has to be read for them
+_EXPORT_LINES_QUERY = """
+    SELECT bl.id, budget.name, post.name, analytic.name, bl.date_from,
+        bl.date_to, bl.paid_date, bl.planned_amount
+    FROM crossovered_budget_lines bl
+    JOIN crossovered_budget budget ON budget.id = bl.crossovered_budget_id
+    JOIN account_budget_post post ON post.id = bl.general_budget_id
+    LEFT JOIN account_analytic_account analytic
+        ON analytic.id = bl.analytic_account_id
+    WHERE bl.crossovered_budget_id IN %s
+    ORDER BY budget.id, bl.date_from, bl.id"""
+
+# Date column moved by a number of months (%(months)s): a date at the end of
+# its month stays at the end of the month
+_SHIFT_DATE_SQL = """
+    CASE WHEN %(column)s = (date_trunc('month', %(column)s) +
+            interval '1 month - 1 day')::date
+        THEN (date_trunc('month', %(column)s) +
+            (%%(months)s + 1) * interval '1 month' - interval '1 day')::date
+        ELSE (%(column)s + %%(months)s * interval '1 month')::date
+    END"""
+
+
+def _shift_date(value, months):
+    """Move a date by a number of months, like ``_SHIFT_DATE_SQL``."""
+    shifted = value + relativedelta(months=months)
+    if (value + relativedelta(days=1)).month != value.month:
+        shifted += relativedelta(day=31)
+    return shifted
+
+
+def _to_seconds(value):
+    """Return a date or datetime as a number of seconds, to compare and
+    subtract them with plain float arithmetic.
+    """
+    seconds = value.toordinal() * 86400.0
+    if isinstance(value, datetime):
+        seconds += (value.hour * 3600 + value.minute * 60 + value.second +
+                    value.microsecond / 1e6)
+    return seconds
+
+
+def _partition(ids, count):
+    """Split ``ids`` in at most ``count`` contiguous partitions of equal
+    sizes, the last one possibly shorter.
+    """
+    count = min(count, len(ids))
+    if not count:
+        return []
+    size = -(-len(ids) // count)
+    return [ids[index:index + size] for index in range(0, len(ids), size)]
+
+
+def _prorata_amounts(rows, now):
+    """Compute the theoretical amounts of a batch of budget lines.
+
+    :param rows: list of (date_from, date_to, paid_date, planned_amount,
+        curve), ``curve`` being the points of the spread profile of the line
+        or None for a uniform spread
+    :param now: current datetime
+    :return: list of theoretical amounts, in the order of ``rows``
+    """
+    now_seconds = _to_seconds(now)
+    amounts = []
+    for date_from, date_to, paid_date, planned_amount, curve in rows:
+        if paid_date:
+            # Nothing is expected anymore once paid after the period
+            amounts.append(
+                0.0 if date_to <= paid_date else planned_amount)
+            continue
+        start = _to_seconds(date_from)
+        end = _to_seconds(date_to)
+        if now_seconds < start:
+            # If the budget line has not started yet, theoretical amount
+            # should be zero
+            amounts.append(0.0)
+        elif end > start and now_seconds < end:
+            # If today is between the budget line date_from and date_to
+            position = now_seconds
+            if curve:
+                low = curve_position(curve, date_from)
+                high = curve_position(curve, date_to)
+                # Spread uniformly when the profile puts nothing there
+                if high > low:
+                    start, end = low, high
+                    position = curve_position(curve, now)
+            amounts.append((position - start) / (end - start) * planned_amount)
+        else:
+            amounts.append(planned_amount)
+    return amounts
+
 
 # ---------------------------------------------------------
 # Budgets
@@ -26,6 +512,20 @@ class AccountBudgetPost(models.Model):
         comodel_name='res.company', string='Company', required=True,
         default=lambda self: self.env['res.company']._company_default_get(
             'account.budget.post'))
+    spread_profile_id = fields.Many2one(
+        comodel_name='account.budget.spread.profile', string='Spread Profile',
+        help='Distribution of the planned amounts over the year used for '
+             'the theoretical amounts of the budget lines having no profile '
+             'of their own. Without profile, it is uniform.')
+    budget_control = fields.Selection(
+        selection=[('none', 'No Control'),
+                   ('warning', 'Warning'),
+                   ('block', 'Block')],
+        string='Budget Control', default='none', required=True,
+        help='What to do when posting a journal entry makes the practical '
+             'amount of a line of a running budget exceed its planned '
+             'amount: nothing, log a warning on the budget or refuse the '
+             'posting.')
 
     def _check_account_ids(self, vals):
         # Raise an error to prevent the account.budget.post to have not
@@ -44,12 +544,57 @@ class AccountBudgetPost(models.Model):
     @api.model
     def create(self, vals):
         self._check_account_ids(vals)
+        self.clear_caches()
         return super(AccountBudgetPost, self).create(vals)
 
     @api.multi
     def write(self, vals):
         self._check_account_ids(vals)
-        return super(AccountBudgetPost, self).write(vals)
+        res = super(AccountBudgetPost, self).write(vals)
+        if 'account_ids' in vals:
+            self.clear_caches()
+            self.mapped(
+                'crossovered_budget_line_ids')._refresh_stored_actuals()
+        return res
+
+    @api.multi
+    def unlink(self):
+        self.clear_caches()
+        return super(AccountBudgetPost, self).unlink()
+
+    @api.multi
+    def _get_account_ids(self):
+        """Return the ids of the accounts of the budgetary position, from a
+        cache shared by all the lines using it.
+        """
+        if not self:
+            return []
+        self.ensure_one()
+        if not isinstance(self.id, int):
+            # Position being edited in a form
+            return self.account_ids.ids
+        return list(self._get_cached_account_ids(self.id))
+
+    @api.model
+    @tools.ormcache('post_id')
+    def _get_cached_account_ids(self, post_id):
+        self.env.cr.execute(
+            "SELECT account_id FROM account_budget_rel WHERE budget_id = %s",
+            (post_id,))
+        return tuple(row[0] for row in self.env.cr.fetchall())
+
+    @api.model
+    @tools.ormcache()
+    def _get_account_post_map(self):
+        """Return a dictionary mapping the ids of the accounts to the ids of
+        the budgetary positions using them, shared by all the lookups.
+        """
+        self.env.cr.execute("""
+            SELECT account_id, array_agg(budget_id ORDER BY budget_id)
+            FROM account_budget_rel
+            GROUP BY account_id""")
+        return {account_id: tuple(post_ids)
+                for account_id, post_ids in self.env.cr.fetchall()}
 
 
 class CrossoveredBudget(models.Model):
@@ -80,11 +625,339 @@ class CrossoveredBudget(models.Model):
     crossovered_budget_line_ids = fields.One2many(
         comodel_name='crossovered.budget.lines',
         inverse_name='crossovered_budget_id', string='Budget Lines',
-        states={'done': [('readonly', True)]}, copy=True)
+        states={'done': [('readonly', True)]}, copy=False)
     company_id = fields.Many2one(
         comodel_name='res.company', string='Company', required=True,
         default=lambda self: self.env['res.company']._company_default_get(
             'account.budget.post'))
+    actuals_basis = fields.Selection(
+        selection=[('accrual', 'Accrual'),
+                   ('cash', 'Cash')],
+        string='Actuals Basis', default='accrual', required=True,
+        states={'done': [('readonly', True)]},
+        help='Accrual: the practical amounts follow the date of the journal '
+             'items. Cash: the amounts of invoices and bills are counted at '
+             'the date of their payments, pro rata of the paid part.')
+    forecast_amount = fields.Float(
+        string='Forecast', digits=0, readonly=True, copy=False,
+        help='Total of the forecasts of the budget lines.')
+    forecast_date = fields.Datetime(
+        string='Forecast On', readonly=True, copy=False)
+    actuals_refresh_date = fields.Datetime(
+        string='Actuals Refreshed On', readonly=True, copy=False,
+        help='Last time the stored practical amounts of the budget lines '
+             'were recomputed by the scheduled action.')
+
+    @api.model
+    def _cron_refresh_actuals(self, batch_size=50, workers=None):
+        """Recompute the stored practical amounts of all the budgets, one
+        transaction per batch of budgets.
+
+        The start of the run is kept in a system parameter until all the
+        budgets are done, so that an interrupted run resumes with the
+        budgets not refreshed since.
+
+        :param workers: number of threads sharing the budgets, each with its
+            own cursor; defaults to the
+            ``account_budget_oca.actuals_refresh_workers`` system parameter
+        """
+        budget_line_obj = self.env['crossovered.budget.lines']
+        if budget_line_obj._get_actuals_mode() != 'stored':
+            return
+        params = self.env['ir.config_parameter'].sudo()
+        run_start = params.get_param(_REFRESH_START_PARAM)
+        if not run_start:
+            run_start = fields.Datetime.to_string(fields.Datetime.now())
+            params.set_param(_REFRESH_START_PARAM, run_start)
+            self._commit_refresh_progress()
+        budgets = self.search([
+            '|', ('actuals_refresh_date', '=', False),
+            ('actuals_refresh_date', '<', run_start)],
+            order='company_id, id')
+        if workers is None:
+            workers = int(params.get_param(
+                'account_budget_oca.actuals_refresh_workers', 1))
+        if workers > 1 and not getattr(
+                threading.currentThread(), 'testing', False):
+            self._refresh_actuals_parallel(budgets.ids, batch_size, workers)
+        else:
+            self._refresh_actuals_batches(budgets.ids, batch_size)
+        params.set_param(_REFRESH_START_PARAM, False)
+
+    @api.model
+    def _refresh_actuals_batches(self, budget_ids, batch_size):
+        done = 0
+        for batch_ids in split_every(batch_size, budget_ids):
+            batch = self.browse(batch_ids)
+            batch.mapped(
+                'crossovered_budget_line_ids')._refresh_stored_actuals()
+            batch.write({'actuals_refresh_date': fields.Datetime.now()})
+            done += len(batch)
+            _logger.info(
+                'Refreshed the actuals of %s/%s budgets', done,
+                len(budget_ids))
+            self._commit_refresh_progress()
+            # Keep the memory flat over long runs
+            self.invalidate_cache()
+
+    @api.model
+    def _refresh_actuals_parallel(self, budget_ids, batch_size, workers):
+        """Share the budgets, sorted by company, in ``workers`` contiguous
+        partitions refreshed by as many threads. Each thread has its own
+        cursor and commits its own batches: the partitions are disjoint, so
+        the threads never update the same rows.
+        """
+        if not budget_ids:
+            return
+        partitions = _partition(budget_ids, workers)
+        _logger.info('Refreshing the actuals of %s budgets with %s workers',
+                     len(budget_ids), len(partitions))
+        with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+            futures = [
+                executor.submit(
+                    self._refresh_actuals_worker, partition, batch_size)
+                for partition in partitions]
+            for future in futures:
+                # Raise the errors of the workers
+                future.result()
+        self.invalidate_cache()
+
+    @api.model
+    def _refresh_actuals_worker(self, budget_ids, batch_size):
+        with api.Environment.manage(), self.pool.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            env['crossovered.budget']._refresh_actuals_batches(
+                budget_ids, batch_size)
+
+    @api.model
+    def _cron_compute_forecast(self, batch_size=50):
+        """Update the forecasts of the running budgets, one transaction per
+        batch of budgets.
+        """
+        budgets = self.search([('state', 'in', ('confirm', 'validate'))])
+        for batch_ids in split_every(batch_size, budgets.ids):
+            self.browse(batch_ids)._compute_forecast()
+            self._commit_refresh_progress()
+            self.invalidate_cache()
+
+    @api.multi
+    @profiled('forecast')
+    def _compute_forecast(self):
+        lines = self.mapped('crossovered_budget_line_ids')
+        amounts = lines._get_forecast_amounts()
+        lines._bulk_update(
+            ['forecast_amount'], [(line.id, amounts[line]) for line in lines])
+        now = fields.Datetime.now()
+        for budget in self:
+            budget.write({
+                'forecast_amount': sum(
+                    amounts[line]
+                    for line in budget.crossovered_budget_line_ids),
+                'forecast_date': now,
+            })
+
+    @api.multi
+    def action_compute_forecast(self):
+        self._compute_forecast()
+
+    @api.model
+    def _commit_refresh_progress(self):
+        if not getattr(threading.currentThread(), 'testing', False):
+            self.env.cr.commit()
+
+    @api.multi
+    def _get_profiling_scope(self):
+        lines = self.mapped('crossovered_budget_line_ids')
+        return {
+            'budget_ids': [(6, 0, self.ids)],
+            'general_budget_ids': [
+                (6, 0, lines.mapped('general_budget_id').ids)],
+            'analytic_account_ids': [
+                (6, 0, lines.mapped('analytic_account_id').ids)],
+        }
+
+    @api.multi
+    def copy(self, default=None):
+        new_budget = super(CrossoveredBudget, self).copy(default)
+        if 'crossovered_budget_line_ids' not in (default or {}):
+            self._copy_lines({self.id: new_budget.id})
+        return new_budget
+
+    @api.model
+    def _get_copied_line_columns(self):
+        """Return the columns of the budget lines copied as they are with
+        the budgets, besides the dates and the planned amount.
+        """
+        return ['general_budget_id', 'analytic_account_id',
+                'spread_profile_id']
+
+    @api.model
+    def _copy_lines(self, budget_map, months=0, factor=1.0):
+        """Copy the lines of budgets to other budgets with one INSERT ...
+        SELECT statement, instead of one ORM copy per line.
+
+        :param budget_map: dictionary mapping the ids of the source budgets
+            to the ids of the target budgets
+        :param months: number of months the dates of the lines are moved by
+        :param factor: factor applied to the planned amounts
+        :return: the created lines
+        """
+        if not budget_map:
+            return self.env['crossovered.budget.lines']
+        columns = self._get_copied_line_columns()
+        uid = int(self.env.uid)
+        self.env.cr.execute("""
+            INSERT INTO crossovered_budget_lines (
+                create_uid, create_date, write_uid, write_date,
+                company_id, crossovered_budget_id, date_from, date_to,
+                paid_date, planned_amount, %(columns)s)
+            SELECT %(uid)s, now() at time zone 'UTC',
+                %(uid)s, now() at time zone 'UTC',
+                budget.company_id, budget.id, %(date_from)s, %(date_to)s,
+                %(paid_date)s, bl.planned_amount * %%(factor)s,
+                %(line_columns)s
+            FROM (VALUES %(values)s) AS budget_copy(source_id, target_id)
+            JOIN crossovered_budget budget
+                ON budget.id = budget_copy.target_id
+            JOIN crossovered_budget_lines bl
+                ON bl.crossovered_budget_id = budget_copy.source_id
+            ORDER BY bl.id
+            RETURNING id""" % {
+            'columns': ', '.join(columns),
+            'line_columns': ', '.join('bl.%s' % column for column in columns),
+            'uid': uid,
+            'date_from': _SHIFT_DATE_SQL % {'column': 'bl.date_from'},
+            'date_to': _SHIFT_DATE_SQL % {'column': 'bl.date_to'},
+            'paid_date': _SHIFT_DATE_SQL % {'column': 'bl.paid_date'},
+            'values': ', '.join(
+                '(%d, %d)' % (int(source_id), int(target_id))
+                for source_id, target_id in budget_map.items()),
+        }, {'months': months, 'factor': factor})
+        lines = self.env['crossovered.budget.lines'].browse(
+            [row[0] for row in self.env.cr.fetchall()])
+        self.invalidate_cache(['crossovered_budget_line_ids'])
+        lines._refresh_stored_actuals()
+        return lines
+
+    @api.multi
+    def _roll_forward(self, months=12, factor=1.0):
+        """Create a copy of each budget for a later period, the dates of the
+        budgets and of their lines being moved by ``months`` months and the
+        planned amounts multiplied by ``factor``.
+
+        :return: the new budgets
+        """
+        vals_list = []
+        for budget in self:
+            date_from = _shift_date(budget.date_from, months)
+            name = budget.name
+            if budget.date_from.year != date_from.year:
+                name = name.replace(
+                    str(budget.date_from.year), str(date_from.year))
+            if name == budget.name:
+                name = '%s (%s)' % (name, fields.Date.to_string(date_from))
+            vals_list.append(budget.copy_data(default={
+                'name': name,
+                'date_from': date_from,
+                'date_to': _shift_date(budget.date_to, months),
+            })[0])
+        new_budgets = self.with_context(tracking_disable=True).create(
+            vals_list)
+        self._copy_lines(dict(zip(self.ids, new_budgets.ids)), months, factor)
+        return new_budgets
+
+    @api.multi
+    def _get_export_header(self):
+        return [_('Budget'), _('Budgetary Position'), _('Analytic Account'),
+                _('Start Date'), _('End Date'), _('Paid Date'),
+                _('Planned Amount'), _('Practical Amount'),
+                _('Theoretical Amount'), _('Achievement')]
+
+    @api.multi
+    def _iter_export_rows(self, chunk_size=2000):
+        """Yield the export rows of the lines of the budgets.
+
+        The lines are fetched from a server-side cursor, ``chunk_size`` at a
+        time, and the amounts of each chunk are computed together with the
+        set-based queries of the budget lines. The cache is cleared after
+        each chunk, so the memory used does not grow with the budgets.
+        """
+        if not self:
+            return
+        cr = self.env.cr
+        cursor_name = 'budget_export_%s' % id(self)
+        cr.execute('DECLARE %s NO SCROLL CURSOR FOR %s' % (
+            cursor_name, _EXPORT_LINES_QUERY), (tuple(self.ids),))
+        try:
+            while True:
+                cr.execute('FETCH %s FROM %s' % (chunk_size, cursor_name))
+                rows = cr.fetchall()
+                if not rows:
+                    break
+                lines = self.env['crossovered.budget.lines'].browse(
+                    [row[0] for row in rows])
+                for line, row in zip(lines, rows):
+                    # Reading the first line computes the whole chunk
+                    yield list(row[1:]) + [
+                        line.practical_amount, line.theoretical_amount,
+                        line.percentage]
+                self.invalidate_cache()
+        finally:
+            cr.execute('CLOSE %s' % cursor_name)
+
+    @api.multi
+    def _export_lines(self, fileobj, file_format='csv'):
+        """Write the lines of the budgets with their amounts to the binary
+        file ``fileobj``, as CSV or XLSX, one chunk of lines at a time.
+        """
+        if file_format == 'xlsx':
+            if xlsxwriter is None:
+                raise UserError(_('The xlsxwriter library is not installed.'))
+            # Rows are flushed to a temporary file as soon as they are
+            # written, instead of being kept in memory
+            workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True})
+            worksheet = workbook.add_worksheet(_('Budget Lines'))
+            date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+            worksheet.write_row(0, 0, self._get_export_header())
+            for index, row in enumerate(self._iter_export_rows(), 1):
+                for column, value in enumerate(row):
+                    if isinstance(value, date):
+                        worksheet.write_datetime(
+                            index, column, datetime.combine(
+                                value, datetime.min.time()), date_format)
+                    else:
+                        worksheet.write(index, column, value)
+            workbook.close()
+        elif file_format == 'csv':
+            stream = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+            writer = csv.writer(stream)
+            writer.writerow(self._get_export_header())
+            for row in self._iter_export_rows():
+                writer.writerow(
+                    [value if value is not None else '' for value in row])
+            stream.flush()
+            # Leave the file open for the caller
+            stream.detach()
+        else:
+            raise UserError(_('Unsupported export format: %s') % file_format)
+
+    @api.multi
+    def _action_export(self, file_format):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/account_budget_oca/export/%s/%s' % (
+                self.id, file_format),
+            'target': 'self',
+        }
+
+    @api.multi
+    def action_export_csv(self):
+        return self._action_export('csv')
+
+    @api.multi
+    def action_export_xlsx(self):
+        return self._action_export('xlsx')
 
     @api.multi
     def action_budget_confirm(self):
@@ -104,6 +977,8 @@ class CrossoveredBudget(models.Model):
 
     @api.multi
     def action_budget_done(self):
+        # Closed budgets no longer follow the journal
+        self.mapped('crossovered_budget_line_ids')._take_snapshot()
         self.write({'state': 'done'})
 
 
@@ -123,89 +998,539 @@ class CrossoveredBudgetLines(models.Model):
     date_to = fields.Date(string='End Date', required=True)
     paid_date = fields.Date()
     planned_amount = fields.Float(required=True, digits=0)
+    spread_profile_id = fields.Many2one(
+        comodel_name='account.budget.spread.profile', string='Spread Profile',
+        help='Distribution of the planned amount over the period used for '
+             'the theoretical amount. Defaults to the profile of the '
+             'budgetary position.')
     practical_amount = fields.Float(
-        compute='_compute_practical_amount', digits=0)
+        compute='_compute_practical_amount', digits=0,
+        search='_search_practical_amount')
     theoretical_amount = fields.Float(
         compute='_compute_theoretical_amount', oldname='theoritical_amount',
-        digits=0)
+        digits=0, search='_search_theoretical_amount')
     percentage = fields.Float(
-        compute='_compute_percentage', string='Achievement')
+        compute='_compute_percentage', string='Achievement',
+        search='_search_percentage')
+    forecast_amount = fields.Float(
+        string='Forecast', digits=0, readonly=True, copy=False,
+        help='Projected practical amount at the end of the period, from the '
+             'trend and the seasonality of the past actuals of the line. '
+             'Updated by a scheduled action.')
+    stored_practical_amount = fields.Float(
+        string='Practical Amount (Stored)', digits=0, readonly=True,
+        copy=False)
+    snapshot_practical_amount = fields.Float(
+        string='Practical Amount (Snapshot)', digits=0, readonly=True,
+        copy=False)
+    snapshot_theoretical_amount = fields.Float(
+        string='Theoretical Amount (Snapshot)', digits=0, readonly=True,
+        copy=False)
+    snapshot_percentage = fields.Float(
+        string='Achievement (Snapshot)', readonly=True, copy=False)
+    snapshot_date = fields.Datetime(
+        readonly=True, copy=False,
+        help='When the amounts of the line were frozen, on closing its '
+             'budget.')
     company_id = fields.Many2one(
         related='crossovered_budget_id.company_id', comodel_name='res.company',
         string='Company', store=True, readonly=True)
 
-    @api.multi
-    def _compute_practical_amount(self):
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
         for line in self:
-            result = 0.0
-            acc_ids = line.general_budget_id.account_ids.ids
-            date_to = line.date_to
-            date_from = line.date_from
-            if line.analytic_account_id.id:
-                self.env.cr.execute(
-                    """
-                    SELECT SUM(amount)
-                    FROM account_analytic_line
-                    WHERE account_id=%s
-                        AND (date between %s
-                        AND %s)
-                        AND general_account_id=ANY(%s)""",
-                    (line.analytic_account_id.id, date_from, date_to, acc_ids,)
-                )
-                result = self.env.cr.fetchone()[0] or 0.0
+            if line.date_from > line.date_to:
+                raise ValidationError(
+                    _('The line of the budgetary position "%s" in the budget '
+                      '"%s" ends (%s) before it starts (%s).') % (
+                        line.general_budget_id.name,
+                        line.crossovered_budget_id.name,
+                        line.date_to, line.date_from))
+
+    @api.model_cr
+    def init(self):
+        cr = self.env.cr
+        cr.execute(CURVE_POSITION_FUNCTION)
+        cr.execute("""
+            SELECT id FROM crossovered_budget_lines
+            WHERE date_from > date_to""")
+        inverted_ids = [row[0] for row in cr.fetchall()]
+        if inverted_ids:
+            _logger.warning(
+                'Budget lines %s end before they start: fix their dates',
+                inverted_ids)
+        if not index_exists(cr, _DATE_RANGE_INDEX):
+            cr.execute("""
+                CREATE INDEX %s ON crossovered_budget_lines
+                USING gist (daterange(LEAST(date_from, date_to),
+                    GREATEST(date_from, date_to), '[]'))""" % (
+                _DATE_RANGE_INDEX,))
+        if tools.config.get('budget_actuals_indexes_concurrently'):
+            # Building the indexes here would lock the journal tables for the
+            # whole upgrade: _create_actuals_indexes_concurrently is called
+            # instead once the module is up to date.
+            _logger.info('Budget actuals indexes are built concurrently')
+            return
+        self._create_actuals_indexes()
+
+    @api.model
+    def _create_actuals_indexes(self, concurrently=False):
+        """Create the indexes used by the actuals queries when missing, or
+        rebuild them when a previous concurrent build failed. Non-key
+        columns are added with INCLUDE when PostgreSQL supports it (11+).
+        """
+        cr = self.env.cr
+        include = cr._cnx.server_version >= 110000
+        for name, table, columns, included in _ACTUALS_INDEXES:
+            cr.execute("""
+                SELECT ix.indisvalid
+                FROM pg_class cl
+                JOIN pg_index ix ON ix.indexrelid = cl.oid
+                WHERE cl.relname = %s""", (name,))
+            row = cr.fetchone()
+            if row and row[0]:
+                continue
+            if row:
+                _logger.warning('Rebuilding invalid index %s', name)
+                cr.execute('DROP INDEX %s%s' % (
+                    concurrently and 'CONCURRENTLY ' or '', name))
+            if include:
+                definition = '(%s) INCLUDE (%s)' % (
+                    ', '.join(columns), ', '.join(included))
             else:
-                self.env.cr.execute(
-                    """
-                    SELECT SUM(credit - debit)
-                    FROM account_move_line
-                    WHERE (date between %s
-                        AND %s)
-                        AND account_id=ANY(%s)""",
-                    (date_from, date_to, acc_ids,)
-                )
-                result = self.env.cr.fetchone()[0] or 0.0
-            line.practical_amount = result
+                definition = '(%s)' % ', '.join(columns + included)
+            _logger.info('Creating index %s on %s', name, table)
+            cr.execute('CREATE INDEX %s%s ON %s %s' % (
+                concurrently and 'CONCURRENTLY ' or '', name, table,
+                definition))
+
+    @api.model
+    def _create_actuals_indexes_concurrently(self):
+        """Create the actuals indexes without locking the journal tables,
+        for live databases. This runs on its own autocommit cursor, and
+        waits for the transactions already running to finish: the calling
+        transaction must therefore not hold a snapshot (commit it first).
+        """
+        with self.pool.cursor() as cr:
+            cr.autocommit(True)
+            self.with_env(self.env(cr=cr))._create_actuals_indexes(
+                concurrently=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(CrossoveredBudgetLines, self).create(vals_list)
+        lines._refresh_stored_actuals()
+        return lines
+
+    @api.model
+    def _bulk_create(self, vals_list):
+        """Create budget lines with multi-row INSERT statements instead of
+        one ORM creation per line, for mass generation. Only the columns of
+        ``_BULK_CREATE_COLUMNS`` are supported, the company being taken
+        from the budget.
+
+        :return: the created lines
+        """
+        ids = []
+        uid = self.env.uid
+        for chunk in split_every(self.env.cr.IN_MAX, vals_list):
+            values = ', '.join([_BULK_CREATE_ROW] * len(chunk))
+            params = []
+            for vals in chunk:
+                # False stands for an empty value in ORM values
+                params.extend(vals.get(column) or None
+                              for column in _BULK_CREATE_COLUMNS[:-1])
+                params.append(vals.get('planned_amount') or 0.0)
+            self.env.cr.execute("""
+                INSERT INTO crossovered_budget_lines (
+                    create_uid, create_date, write_uid, write_date,
+                    company_id, %(columns)s)
+                SELECT %(uid)s, now() at time zone 'UTC',
+                    %(uid)s, now() at time zone 'UTC',
+                    budget.company_id, %(line_columns)s
+                FROM (VALUES %(values)s) AS line(%(columns)s)
+                JOIN crossovered_budget budget
+                    ON budget.id = line.crossovered_budget_id
+                RETURNING id""" % {
+                'columns': ', '.join(_BULK_CREATE_COLUMNS),
+                'line_columns': ', '.join(
+                    'line.%s' % column for column in _BULK_CREATE_COLUMNS),
+                'uid': int(uid),
+                'values': values,
+            }, params)
+            ids.extend(row[0] for row in self.env.cr.fetchall())
+        lines = self.browse(ids)
+        self.env['crossovered.budget'].invalidate_cache(
+            ['crossovered_budget_line_ids'])
+        lines._refresh_stored_actuals()
+        return lines
 
     @api.multi
+    def write(self, vals):
+        res = super(CrossoveredBudgetLines, self).write(vals)
+        if _ACTUALS_KEY_FIELDS.intersection(vals):
+            self._refresh_stored_actuals()
+        return res
+
+    @api.model
+    def _get_actuals_mode(self):
+        """Return how practical amounts are obtained: ``live`` computes them
+        from the journal on every read, ``stored`` reads the
+        ``stored_practical_amount`` column, kept up to date incrementally by
+        the journal items and analytic lines, and ``summary`` reads the
+        periodically refreshed ``account.budget.daily.actual`` totals.
+        """
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'account_budget_oca.actuals_mode', 'live')
+
+    @api.multi
+    def _refresh_stored_actuals(self):
+        """Recompute from scratch the stored practical amount of the lines,
+        when the stored mode is enabled.
+        """
+        if not self or self._get_actuals_mode() != 'stored':
+            return
+        amounts = self._get_practical_amounts()
+        self._bulk_update(
+            ['stored_practical_amount'],
+            [(line.id, amounts[line]) for line in self])
+
+    @api.multi
+    def _get_profiling_scope(self):
+        lines = self.filtered(lambda l: isinstance(l.id, int))
+        return {
+            'budget_ids': [(6, 0, lines.mapped('crossovered_budget_id').ids)],
+            'general_budget_ids': [
+                (6, 0, lines.mapped('general_budget_id').ids)],
+            'analytic_account_ids': [
+                (6, 0, lines.mapped('analytic_account_id').ids)],
+        }
+
+    @api.model
+    def _bulk_update(self, columns, rows):
+        """Write different values on many lines with one UPDATE statement per
+        chunk, instead of one ORM write per line.
+
+        :param columns: names of the updated columns
+        :param rows: list of tuples (line id, value of each column)
+        """
+        template = '(%s)' % ', '.join(['%s'] * (len(columns) + 1))
+        for chunk in split_every(self.env.cr.IN_MAX, rows):
+            params = [value for row in chunk for value in row]
+            self.env.cr.execute("""
+                UPDATE crossovered_budget_lines bl
+                SET %s
+                FROM (VALUES %s) AS line(id, %s)
+                WHERE bl.id = line.id""" % (
+                ', '.join('%s = line.%s' % (column, column)
+                          for column in columns),
+                ', '.join([template] * len(chunk)),
+                ', '.join(columns)), params)
+        self.invalidate_cache(columns, [row[0] for row in rows])
+
+    @api.multi
+    def _is_frozen(self):
+        """Tell whether the amounts of the line come from the snapshot taken
+        when its budget was done.
+        """
+        self.ensure_one()
+        return bool(self.snapshot_date and
+                    self.crossovered_budget_id.state == 'done')
+
+    @api.multi
+    def _take_snapshot(self):
+        """Freeze the practical, theoretical amounts and the achievement of
+        the lines, with a single bulk update.
+        """
+        now = fields.Datetime.now()
+        self._bulk_update(
+            ['snapshot_practical_amount', 'snapshot_theoretical_amount',
+             'snapshot_percentage', 'snapshot_date'],
+            [(line.id, line.practical_amount, line.theoretical_amount,
+              line.percentage, now) for line in self])
+
+    @api.model
+    def _apply_actuals_delta(self, query, ids, sign):
+        """Add (``sign`` = 1) or remove (``sign`` = -1) the amounts of the
+        given journal items or analytic lines to the stored practical amount
+        of the budget lines covering them.
+        """
+        if not ids or self._get_actuals_mode() != 'stored':
+            return
+        self.env.cr.execute("""
+            UPDATE crossovered_budget_lines bl
+            SET stored_practical_amount =
+                COALESCE(bl.stored_practical_amount, 0.0) + %s * delta.amount
+            FROM (""" + query + """) AS delta
+            WHERE bl.id = delta.line_id""", (sign, tuple(ids)))
+        self.invalidate_cache(['stored_practical_amount'])
+
+    @api.model
+    def _apply_move_line_actuals(self, move_line_ids, sign):
+        self._apply_actuals_delta(
+            _MOVE_LINE_DELTA_QUERY, move_line_ids, sign)
+
+    @api.model
+    def _apply_analytic_line_actuals(self, analytic_line_ids, sign):
+        self._apply_actuals_delta(
+            _ANALYTIC_LINE_DELTA_QUERY, analytic_line_ids, sign)
+
+    @api.model
+    def _find_covering_lines(self, move_lines):
+        """Return a dictionary mapping the ids of journal items to the ids of
+        the budget lines covering them, with one query per chunk of items.
+        Items whose account belongs to no budgetary position are skipped
+        without querying.
+        """
+        post_map = self.env['account.budget.post']._get_account_post_map()
+        move_line_ids = [move_line.id for move_line in move_lines
+                         if move_line.account_id.id in post_map]
+        covering_lines = {}
+        for chunk in split_every(self.env.cr.IN_MAX, move_line_ids):
+            self.env.cr.execute(_COVERING_LINES_QUERY, (tuple(chunk),))
+            covering_lines.update(self.env.cr.fetchall())
+        return covering_lines
+
+    @api.multi
+    def _filter_cash_basis(self):
+        return self.filtered(
+            lambda l: l.crossovered_budget_id.actuals_basis == 'cash')
+
+    @api.model
+    def _check_budget_control(self, moves):
+        """Check the budget lines under control covering the journal items
+        of moves being posted, with one query for all the moves.
+
+        :raise UserError: when a move makes a line under the ``block``
+            control exceed its planned amount
+        """
+        post_map = self.env['account.budget.post']._get_account_post_map()
+        if not any(move_line.account_id.id in post_map
+                   for move_line in moves.mapped('line_ids')):
+            return
+        self.env.cr.execute(_CONTROLLED_LINES_QUERY, (tuple(moves.ids),))
+        deltas = dict(self.env.cr.fetchall())
+        lines = self.browse(list(deltas))
+        amounts = lines._get_practical_amounts(live=True)
+        # Planned amounts are negative for expenses: a line is exceeded
+        # when the moves push its practical amount beyond the planned one
+        exceeded = lines.filtered(
+            lambda l: deltas[l.id] * l.planned_amount > 0 and
+            abs(amounts[l]) > abs(l.planned_amount))
+        if not exceeded:
+            return
+        messages = {line: _(
+            '%s - %s%s (%s to %s): practical amount %s, planned %s') % (
+            line.crossovered_budget_id.name, line.general_budget_id.name,
+            line.analytic_account_id and
+            ' - %s' % line.analytic_account_id.display_name or '',
+            line.date_from, line.date_to, amounts[line],
+            line.planned_amount) for line in exceeded}
+        blocked = exceeded.filtered(
+            lambda l: l.general_budget_id.budget_control == 'block')
+        if blocked:
+            raise UserError(
+                _('Posting %s would exceed the budget:\n%s') % (
+                    ', '.join(moves.mapped('name')),
+                    '\n'.join(messages[line] for line in blocked)))
+        for budget in exceeded.mapped('crossovered_budget_id'):
+            budget.message_post(body=_(
+                'Budget exceeded by the posting of %s:<br/>%s') % (
+                ', '.join(moves.mapped('name')), '<br/>'.join(
+                    tools.html_escape(messages[line]) for line in exceeded
+                    if line.crossovered_budget_id == budget)))
+
+    @api.multi
+    def _get_practical_amounts(self, live=False):
+        """Return a dictionary mapping each line of the recordset to its
+        practical amount.
+
+        Lines are split between analytic and general ones and each group is
+        resolved with a single grouped query against a VALUES list of the
+        line ranges, instead of one query per line. In ``summary`` mode the
+        query reads the running sums of the daily actuals instead of the
+        journal, unless ``live`` is set or the daily actuals were not
+        filled yet. The lines of cash-basis budgets are always resolved from
+        the journal and the reconciliations.
+        """
+        amounts = dict.fromkeys(self, 0.0)
+        analytic_lines = self.filtered(lambda l: l.analytic_account_id.id)
+        cash_lines = self._filter_cash_basis()
+        if not live and self._get_actuals_mode() == 'summary' and self.env[
+                'account.budget.daily.actual']._is_populated():
+            queries = (_ANALYTIC_SUMMARY_QUERY, _GENERAL_SUMMARY_QUERY)
+        else:
+            queries = (_ANALYTIC_ACTUALS_QUERY, _GENERAL_ACTUALS_QUERY)
+        for lines, query in (
+                (analytic_lines - cash_lines, queries[0]),
+                (self - analytic_lines - cash_lines, queries[1]),
+                (analytic_lines & cash_lines, _ANALYTIC_CASH_QUERY),
+                (cash_lines - analytic_lines, _GENERAL_CASH_QUERY)):
+            for chunk in split_every(
+                    self.env.cr.IN_MAX, lines.ids, lines.browse):
+                amounts.update(chunk._execute_actuals_query(query))
+        return amounts
+
+    @api.multi
+    def _get_actuals_query_params(self):
+        """Return the VALUES rows (one per line) used by the actuals queries.
+        Each row holds the position of the line in the recordset, its
+        analytic account, its date range and its general accounts.
+        """
+        account_ids = {}
+        params = []
+        for key, line in enumerate(self):
+            post = line.general_budget_id
+            if post not in account_ids:
+                account_ids[post] = post._get_account_ids()
+            params.extend([key, line.analytic_account_id.id or None,
+                           line.date_from, line.date_to, account_ids[post]])
+        return params
+
+    @api.multi
+    def _execute_actuals_query(self, query):
+        if not self:
+            return {}
+        values = ', '.join([_ACTUALS_VALUES_ROW] * len(self))
+        self.env.cr.execute(
+            query % values, self._get_actuals_query_params())
+        amounts = {}
+        for key, amount, count in self.env.cr.fetchall():
+            amounts[self[key]] = amount or 0.0
+            record_rows(count)
+        return amounts
+
+    @api.model
+    def _search_amount(self, column, operator, value):
+        """Search budget lines on one of their computed amounts, with a
+        sub-query computing the amounts of the lines in the database. The
+        stored practical amounts are used in the stored actuals mode.
+        """
+        if operator not in _SEARCH_OPERATORS:
+            raise UserError(_('Operation not supported'))
+        if self._get_actuals_mode() == 'stored':
+            amounts_query = _STORED_LINE_AMOUNTS_QUERY
+        else:
+            amounts_query = _LINE_AMOUNTS_QUERY
+        query = """
+            SELECT line_id
+            FROM (%s) AS amounts
+            WHERE %s %s %%s""" % (
+            _LINE_PERCENTAGE_QUERY % amounts_query, column, operator)
+        return [('id', 'inselect', (query, (value or 0.0,)))]
+
+    @api.model
+    def _search_practical_amount(self, operator, value):
+        return self._search_amount('practical_amount', operator, value)
+
+    @api.model
+    def _search_theoretical_amount(self, operator, value):
+        return self._search_amount('theoretical_amount', operator, value)
+
+    @api.model
+    def _search_percentage(self, operator, value):
+        return self._search_amount('percentage', operator, value)
+
+    @api.multi
+    @profiled('practical_amount')
+    def _compute_practical_amount(self):
+        lines = self.filtered(lambda l: not l._is_frozen())
+        for line in self - lines:
+            line.practical_amount = line.snapshot_practical_amount
+        if self._get_actuals_mode() == 'stored':
+            # Records being edited in a form have no stored value yet, the
+            # stored value of cash-basis lines is not used
+            stored_lines = lines.filtered(
+                lambda l: isinstance(l.id, int)) - lines._filter_cash_basis()
+            for line in stored_lines:
+                line.practical_amount = line.stored_practical_amount
+            lines -= stored_lines
+        amounts = lines._get_practical_amounts()
+        for line in lines:
+            line.practical_amount = amounts[line]
+
+    @api.multi
+    def _get_monthly_history(self, today):
+        """Return the monthly actuals the forecast of the lines is based on,
+        by budgetary position and analytic account: lines sharing them share
+        their history, fetched with one grouped query per chunk of pairs.
+
+        :return: dictionary mapping each (budgetary position, analytic
+            account) pair of the lines to a dictionary of amounts by month
+            index
+        """
+        date_from, date_to = history_window(today)
+        history = {(line.general_budget_id, line.analytic_account_id): {}
+                   for line in self}
+        keys = list(history)
+        for analytic, query in ((True, _ANALYTIC_HISTORY_QUERY),
+                                (False, _GENERAL_HISTORY_QUERY)):
+            group = [key for key in keys if bool(key[1]) == analytic]
+            for chunk in split_every(self.env.cr.IN_MAX, group):
+                params = []
+                for index, (post, analytic_account) in enumerate(chunk):
+                    params.extend([index, analytic_account.id or None,
+                                   date_from, date_to,
+                                   post._get_account_ids()])
+                self.env.cr.execute(query % ', '.join(
+                    [_ACTUALS_VALUES_ROW] * len(chunk)), params)
+                for index, month, amount, count in self.env.cr.fetchall():
+                    history[chunk[index]][month_index(month)] = amount
+                    record_rows(count)
+        return history
+
+    @api.multi
+    def _get_forecast_amounts(self):
+        """Return a dictionary mapping each line to its projected practical
+        amount at the end of its period.
+        """
+        today = fields.Date.context_today(self)
+        history = self._get_monthly_history(today)
+        return {line: project_landing(
+            history[(line.general_budget_id, line.analytic_account_id)],
+            line.date_from, line.date_to, line.practical_amount, today)
+            for line in self}
+
+    @api.multi
+    def _get_spread_curve(self):
+        """Return the points of the cumulative curve of the spread profile
+        of the line, or None for a uniform spread.
+        """
+        self.ensure_one()
+        profile = (self.spread_profile_id or
+                   self.general_budget_id.spread_profile_id)
+        if not profile.curve:
+            return None
+        return profile._get_curve_points(profile.curve)
+
+    @api.multi
+    def _get_theoretical_amounts(self):
+        """Return the theoretical amounts of the lines, in the recordset
+        order, reading the clock once for the whole batch.
+        """
+        now = from_string(fields.Datetime.now())
+        return _prorata_amounts([
+            (line.date_from, line.date_to, line.paid_date,
+             line.planned_amount, line._get_spread_curve())
+            for line in self], now)
+
+    @api.multi
+    @profiled('theoretical_amount')
     def _compute_theoretical_amount(self):
-        today = fields.Datetime.now()
-        for line in self:
-            # Used for the report
-
-            if line.paid_date:
-                if (from_string(line.date_to) <=
-                        from_string(line.paid_date)):
-                    theo_amt = 0.00
-                else:
-                    theo_amt = line.planned_amount
-            else:
-                line_timedelta = (
-                    from_string(line.date_to) -
-                    from_string(line.date_from))
-                elapsed_timedelta = (
-                    from_string(today) - (from_string(line.date_from)))
-
-                if elapsed_timedelta.days < 0:
-                    # If the budget line has not started yet, theoretical
-                    # amount should be zero
-                    theo_amt = 0.00
-                elif (line_timedelta.days > 0 and
-                      from_string(today) < from_string(line.date_to)):
-                    # If today is between the budget line date_from and
-                    # date_to
-                    theo_amt = (
-                        (elapsed_timedelta.total_seconds() /
-                         line_timedelta.total_seconds()) *
-                        line.planned_amount)
-                else:
-                    theo_amt = line.planned_amount
-
-            line.theoretical_amount = theo_amt
+        # Used for the report
+        lines = self.filtered(lambda l: not l._is_frozen())
+        for line in self - lines:
+            line.theoretical_amount = line.snapshot_theoretical_amount
+        for line, amount in zip(lines, lines._get_theoretical_amounts()):
+            line.theoretical_amount = amount
 
     @api.multi
+    @profiled('percentage')
     def _compute_percentage(self):
         for line in self:
-            if line.theoretical_amount != 0.00:
+            if line._is_frozen():
+                line.percentage = line.snapshot_percentage
+            elif line.theoretical_amount != 0.00:
                 line.percentage = (
                     float((line.practical_amount or 0.0) /
                           line.theoretical_amount) * 100)
@@ -0,0 +1,91 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+from odoo import api, fields, models
+
+from .budget_matview import create_view, is_populated, refresh_view
+
+_logger = logging.getLogger(__name__)
+
+
+class AccountBudgetDailyActual(models.Model):
+    """Daily totals of the journal, with their running sum per account, used
+    to get the actuals of any budget line period with two index lookups.
+
+    Rows coming from the journal items have no analytic account, rows coming
+    from the analytic lines have one.
+    """
+    _name = "account.budget.daily.actual"
+    _description = "Budget Daily Actuals"
+    _auto = False
+    _order = "date"
+
+    company_id = fields.Many2one(
+        comodel_name='res.company', string='Company', readonly=True)
+    account_id = fields.Many2one(
+        comodel_name='account.account', string='Account', readonly=True)
+    analytic_account_id = fields.Many2one(
+        comodel_name='account.analytic.account', string='Analytic Account',
+        readonly=True)
+    date = fields.Date(readonly=True)
+    amount = fields.Float(digits=0, readonly=True)
+    cumulative_amount = fields.Float(digits=0, readonly=True)
+
+    @api.model_cr
+    def init(self):
+        # The budget lines read the journal until the view is filled
+        create_view(self.env.cr, self._table, """
+            SELECT row_number() OVER (
+                    ORDER BY daily.date, daily.account_id,
+                        daily.analytic_key, daily.company_id
+                ) AS id, daily.*,
+                SUM(daily.amount) OVER (
+                    PARTITION BY daily.account_id,
+                        daily.analytic_account_id
+                    ORDER BY daily.date) AS cumulative_amount
+            FROM (
+                SELECT company_id, account_id,
+                    NULL::integer AS analytic_account_id,
+                    0 AS analytic_key, date,
+                    SUM(credit - debit) AS amount
+                FROM account_move_line
+                GROUP BY company_id, account_id, date
+                UNION ALL
+                SELECT company_id, general_account_id AS account_id,
+                    account_id AS analytic_account_id,
+                    account_id AS analytic_key, date,
+                    SUM(amount) AS amount
+                FROM account_analytic_line
+                WHERE general_account_id IS NOT NULL
+                GROUP BY company_id, general_account_id, account_id, date
+            ) AS daily""")
+        # Key of the concurrent refreshes: it must be made of plain columns,
+        # hence analytic_key standing for the analytic account of the rows
+        # without one. The ids only order the rows by date, so that a
+        # refresh renumbers the latest days only.
+        self.env.cr.execute(
+            "CREATE UNIQUE INDEX %s_key_index ON %s "
+            "(account_id, analytic_key, date, company_id)"
+            % (self._table, self._table))
+        self.env.cr.execute(
+            "CREATE INDEX %s_id_index ON %s (id)"
+            % (self._table, self._table))
+        self.env.cr.execute(
+            "CREATE INDEX %s_lookup_index ON %s "
+            "(account_id, analytic_account_id, date)"
+            % (self._table, self._table))
+
+    @api.model
+    def _is_populated(self):
+        return is_populated(self.env.cr, self._table)
+
+    @api.model
+    def _refresh(self):
+        """Refresh the daily totals when they are used by the budgets."""
+        mode = self.env['crossovered.budget.lines']._get_actuals_mode()
+        if mode != 'summary':
+            return
+        _logger.info('Refreshing budget daily actuals')
+        refresh_view(self.env.cr, self._table)
+        self.invalidate_cache()
@@ -0,0 +1,83 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import ValidationError
+
+from .budget_spread import PERIOD_COUNTS, cumulative_curve
+
+
+class AccountBudgetSpreadProfile(models.Model):
+    """Seasonal distribution of the planned amounts over the year, used
+    instead of a uniform spread to compute the theoretical amounts.
+    """
+    _name = "account.budget.spread.profile"
+    _description = "Budget Spread Profile"
+    _order = "name"
+
+    name = fields.Char(required=True, translate=True)
+    active = fields.Boolean(default=True)
+    period_type = fields.Selection(
+        selection=[('monthly', 'Monthly'),
+                   ('weekly', 'Weekly')],
+        string='Periods', default='monthly', required=True)
+    weight_ids = fields.One2many(
+        comodel_name='account.budget.spread.profile.weight',
+        inverse_name='profile_id', string='Weights', copy=True)
+    curve = fields.Text(
+        compute='_compute_curve', store=True, readonly=True,
+        help='Cumulative share of the weights at the bounds of the periods, '
+             'computed when the weights change.')
+
+    @api.depends('period_type', 'weight_ids.period', 'weight_ids.weight')
+    def _compute_curve(self):
+        for profile in self:
+            weights = dict.fromkeys(
+                range(1, PERIOD_COUNTS[profile.period_type] + 1), 0.0)
+            for weight in profile.weight_ids:
+                if weight.period in weights:
+                    weights[weight.period] += weight.weight
+            curve = cumulative_curve(
+                profile.period_type, [weights[period]
+                                      for period in sorted(weights)])
+            profile.curve = curve and json.dumps(curve)
+
+    @api.onchange('period_type')
+    def _onchange_period_type(self):
+        # Start from a uniform spread
+        self.weight_ids = [(5, 0, 0)] + [
+            (0, 0, {'period': period, 'weight': 1.0})
+            for period in range(1, PERIOD_COUNTS[self.period_type] + 1)]
+
+    @api.model
+    @tools.ormcache('curve')
+    def _get_curve_points(self, curve):
+        """Return the points of a stored curve, parsed once for all the
+        lines using it.
+        """
+        return tuple(tuple(point) for point in json.loads(curve))
+
+
+class AccountBudgetSpreadProfileWeight(models.Model):
+    _name = "account.budget.spread.profile.weight"
+    _description = "Budget Spread Profile Weight"
+    _order = "profile_id, period"
+
+    profile_id = fields.Many2one(
+        comodel_name='account.budget.spread.profile', string='Profile',
+        required=True, ondelete='cascade', index=True)
+    period = fields.Integer(
+        required=True, help='Month (1 to 12) or week (1 to 52) of the year.')
+    weight = fields.Float(required=True, default=1.0)
+
+    @api.constrains('period', 'weight')
+    def _check_period(self):
+        for weight in self:
+            count = PERIOD_COUNTS[weight.profile_id.period_type]
+            if not 1 <= weight.period <= count:
+                raise ValidationError(
+                    _('The period of a weight must be between 1 and %s.') %
+                    count)
+            if weight.weight < 0:
+                raise ValidationError(_('Weights cannot be negative.'))
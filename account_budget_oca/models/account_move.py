@@ -0,0 +1,14 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    @api.multi
+    def post(self, invoice=False):
+        res = super(AccountMove, self).post(invoice=invoice)
+        # Checked once posted, when the analytic lines exist
+        self.env['crossovered.budget.lines']._check_budget_control(self)
+        return res
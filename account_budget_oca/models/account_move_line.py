@@ -0,0 +1,42 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, models
+
+# Fields of a journal item that are summed up in the budget actuals
+_ACTUALS_FIELDS = {'account_id', 'date', 'debit', 'credit'}
+
+
+class AccountMoveLine(models.Model):
+    _inherit = "account.move.line"
+
+    # The stored practical amount of the budget lines is maintained at the
+    # lowest level, so that computed fields such as ``date`` (related to the
+    # move) are tracked as well as the values given by the user.
+
+    @api.model
+    def _create(self, data_list):
+        records = super(AccountMoveLine, self)._create(data_list)
+        self.env['crossovered.budget.lines']._apply_move_line_actuals(
+            records.ids, 1)
+        return records
+
+    @api.multi
+    def _write(self, vals):
+        budget_line_obj = self.env['crossovered.budget.lines']
+        tracked = bool(_ACTUALS_FIELDS.intersection(vals))
+        if tracked:
+            budget_line_obj._apply_move_line_actuals(self.ids, -1)
+        res = super(AccountMoveLine, self)._write(vals)
+        if tracked:
+            budget_line_obj._apply_move_line_actuals(self.ids, 1)
+        return res
+
+    @api.multi
+    def unlink(self):
+        # Analytic lines are removed by the database cascade, without going
+        # through their own unlink: take their amounts out beforehand
+        budget_line_obj = self.env['crossovered.budget.lines']
+        budget_line_obj._apply_analytic_line_actuals(
+            self.mapped('analytic_line_ids').ids, -1)
+        budget_line_obj._apply_move_line_actuals(self.ids, -1)
+        return super(AccountMoveLine, self).unlink()
@@ -0,0 +1,83 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+"""Projection of the landing amount of budget lines.
+
+The monthly actuals of the past ``HISTORY_MONTHS`` complete months are fitted
+with a least-squares line. Each remaining month of a budget line is projected
+on that trend, corrected by the deviation from the trend observed on the same
+calendar month in the latest year of the history. The functions work on plain
+numbers, so that projecting thousands of lines costs no query beyond the
+fetch of their history.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+# Number of complete months the projection is fitted on
+HISTORY_MONTHS = 24
+
+
+def month_index(value):
+    """Return the number of months since year 0 of a date."""
+    return value.year * 12 + value.month - 1
+
+
+def history_window(today):
+    """Return the first and last days of the months the projection is fitted
+    on: the ``HISTORY_MONTHS`` months before the month of ``today``.
+    """
+    first = month_index(today) - HISTORY_MONTHS
+    return (date(first // 12, first % 12 + 1, 1),
+            today.replace(day=1) - timedelta(days=1))
+
+
+def linear_trend(values):
+    """Fit ``values`` (one per month, the last one at x = -1) with a
+    least-squares line.
+
+    :return: (intercept at x = 0, slope)
+    """
+    count = len(values)
+    xs = range(-count, 0)
+    mean_x = sum(xs) / count
+    mean_y = sum(values) / count
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y)
+                for x, y in zip(xs, values)) / variance
+    return mean_y - slope * mean_x, slope
+
+
+def project_landing(history, date_from, date_to, actual, today):
+    """Project the amount of a budget line at the end of its period.
+
+    :param history: dictionary mapping the month indexes of the history
+        window to the actuals of the line accounts in that month
+    :param actual: practical amount of the line to date
+    :return: ``actual`` plus the projected amount of the rest of the period
+    """
+    if date_to <= today:
+        return actual
+    current = month_index(today)
+    first = current - HISTORY_MONTHS
+    values = [history.get(month, 0.0) for month in range(first, current)]
+    intercept, slope = linear_trend(values)
+
+    def predict(month):
+        trend = intercept + slope * (month - current)
+        # Same month of the latest year of the history
+        last_year = month - 12
+        while last_year >= current:
+            last_year -= 12
+        if last_year >= first:
+            trend += values[last_year - first] - (
+                intercept + slope * (last_year - current))
+        return trend
+
+    start = max(date_from, today + timedelta(days=1))
+    landing = actual
+    while start <= date_to:
+        days_in_month = calendar.monthrange(start.year, start.month)[1]
+        end = min(date_to, start.replace(day=days_in_month))
+        landing += predict(month_index(start)) * (
+            (end - start).days + 1) / days_in_month
+        start = end + timedelta(days=1)
+    return landing
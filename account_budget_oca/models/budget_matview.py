@@ -0,0 +1,27 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+"""Materialized views of the budgets.
+
+The views are created empty and filled on their first refresh rather than on
+every upgrade of the module, as filling them scans the whole journal.
+"""
+
+
+def create_view(cr, table, query):
+    """(Re)create the empty materialized view ``table`` of ``query``."""
+    cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s" % table)
+    cr.execute("CREATE MATERIALIZED VIEW %s AS (%s\n) WITH NO DATA" % (
+        table, query))
+
+
+def is_populated(cr, table):
+    cr.execute(
+        "SELECT ispopulated FROM pg_matviews WHERE matviewname = %s",
+        (table,))
+    return cr.fetchone()[0]
+
+
+def refresh_view(cr, table):
+    # Concurrent refreshes keep the view readable meanwhile, but are only
+    # possible on a populated view
+    cr.execute("REFRESH MATERIALIZED VIEW %s%s" % (
+        is_populated(cr, table) and 'CONCURRENTLY ' or '', table))
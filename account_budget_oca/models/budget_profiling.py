@@ -0,0 +1,73 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+"""Optional instrumentation of the budget hot paths.
+
+Profiling is enabled by the ``account_budget_oca.profiling`` system
+parameter, or for a single call by the ``budget_profiling`` context key. Each
+profiled call is logged and recorded as a ``crossovered.budget.stat``.
+"""
+
+import functools
+import logging
+import threading
+import time
+
+from odoo.tools import str2bool
+
+_logger = logging.getLogger(__name__)
+
+# Rows counters of the profiled calls in progress, innermost last
+_local = threading.local()
+
+
+def is_profiling(env):
+    return bool(env.context.get('budget_profiling') or str2bool(
+        env['ir.config_parameter'].sudo().get_param(
+            'account_budget_oca.profiling', 'False'), False))
+
+
+def record_rows(count):
+    """Add ``count`` rows to the rows read by the profiled call in
+    progress, if any.
+    """
+    counters = getattr(_local, 'counters', None)
+    if counters:
+        counters[-1] += count
+
+
+def profiled(name):
+    """Decorate a method of budgets or budget lines to record its wall
+    time, query count, rows read and batch size when profiling is enabled.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self or not is_profiling(self.env):
+                return method(self, *args, **kwargs)
+            counters = _local.__dict__.setdefault('counters', [])
+            counters.append(0)
+            queries = self.env.cr.sql_log_count
+            start = time.time()
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                rows = counters.pop()
+            # Failed calls are not recorded: their transaction may be aborted
+            duration = time.time() - start
+            vals = dict(
+                self._get_profiling_scope(),
+                name=name,
+                model=self._name,
+                user_id=self.env.uid,
+                duration=duration,
+                query_count=self.env.cr.sql_log_count - queries,
+                row_count=rows,
+                batch_size=len(self),
+            )
+            _logger.info(
+                'Budget %(name)s on %(batch_size)s %(model)s: '
+                '%(duration).4fs, %(query_count)s queries, '
+                '%(row_count)s rows', vals)
+            self.env['crossovered.budget.stat'].sudo().create(vals)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,106 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+"""Cumulative curves of the budget spread profiles.
+
+A profile spreads a year over monthly or weekly weights. Its curve is the
+list of the (position in the year, cumulative share of the weights) points at
+the bounds of the periods, positions and shares ranging from 0 to 1. It is
+computed once when the weights change; the share of a line spent at a given
+time is then found by interpolating the curve.
+"""
+
+import bisect
+from datetime import date, datetime
+
+# Days of the months of a common year, the curve positions being based on it
+_MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+PERIOD_COUNTS = {
+    'monthly': 12,
+    'weekly': 52,
+}
+
+
+def _period_bounds(period_type):
+    """Return the positions in the year of the bounds of the periods. The
+    last week absorbs the last day (two in leap years) of the year.
+    """
+    if period_type == 'monthly':
+        bounds = [0]
+        for days in _MONTH_DAYS:
+            bounds.append(bounds[-1] + days)
+        return [days / 365.0 for days in bounds]
+    return [min(week * 7 / 365.0, 1.0) for week in range(52)] + [1.0]
+
+
+def cumulative_curve(period_type, weights):
+    """Return the curve of weights given in the order of the periods, or
+    None when they add up to nothing.
+    """
+    total = float(sum(weights))
+    if total <= 0:
+        return None
+    curve = []
+    cumulative = 0.0
+    for position, weight in zip(_period_bounds(period_type), [0.0] + weights):
+        cumulative += weight
+        curve.append((position, cumulative / total))
+    return curve
+
+
+def curve_position(curve, value):
+    """Return the share of the weights spent at a date or datetime, counted
+    since the start of year 0: the integer part is the year, the decimal
+    part the interpolated share of the curve in that year.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    start = datetime(value.year, 1, 1)
+    year_days = (date(value.year + 1, 1, 1) - start.date()).days
+    position = (value - start).total_seconds() / (year_days * 86400.0)
+    positions = [point[0] for point in curve]
+    index = min(max(bisect.bisect_right(positions, position), 1),
+                len(curve) - 1)
+    (low_position, low_share), (high_position, high_share) = (
+        curve[index - 1], curve[index])
+    share = low_share
+    if high_position > low_position:
+        share += (high_share - low_share) * min(
+            (position - low_position) / (high_position - low_position), 1.0)
+    return value.year + share
+
+
+# Same as curve_position, for the amounts computed in the database (search
+# and analysis of the budget lines) from the curve stored as JSON
+CURVE_POSITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION account_budget_curve_position(
+        curve text, value timestamp)
+    RETURNS double precision AS $$
+        WITH point AS (
+            SELECT point.rank,
+                (point.element->>0)::double precision AS position,
+                (point.element->>1)::double precision AS share
+            FROM json_array_elements(curve::json)
+                WITH ORDINALITY AS point(element, rank)
+        ), target AS (
+            SELECT EXTRACT(EPOCH FROM value - date_trunc('year', value))
+                / EXTRACT(EPOCH FROM date_trunc('year', value)
+                    + interval '1 year' - date_trunc('year', value))
+                ::double precision AS position
+        ), segment AS (
+            SELECT GREATEST(LEAST(
+                COUNT(*) FILTER (WHERE point.position <= target.position),
+                (SELECT COUNT(*) FROM point) - 1), 1) AS rank
+            FROM point CROSS JOIN target
+        )
+        SELECT EXTRACT(YEAR FROM value)::double precision + low.share
+            + CASE WHEN high.position > low.position
+                THEN (high.share - low.share) * LEAST(
+                    (target.position - low.position)
+                    / (high.position - low.position), 1.0)
+                ELSE 0.0
+            END
+        FROM segment
+        CROSS JOIN target
+        JOIN point low ON low.rank = segment.rank
+        JOIN point high ON high.rank = segment.rank + 1
+    $$ LANGUAGE sql IMMUTABLE STRICT"""
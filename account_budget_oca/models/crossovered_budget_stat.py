@@ -0,0 +1,43 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+
+class CrossoveredBudgetStat(models.Model):
+    """Measures of a budget computation, recorded when profiling is
+    enabled (see ``budget_profiling``).
+    """
+    _name = "crossovered.budget.stat"
+    _description = "Budget Computation Statistics"
+    _order = "id desc"
+
+    name = fields.Char(string='Computation', required=True, readonly=True)
+    model = fields.Char(readonly=True)
+    user_id = fields.Many2one(
+        comodel_name='res.users', string='User', readonly=True,
+        default=lambda self: self.env.uid)
+    duration = fields.Float(string='Duration (s)', readonly=True)
+    query_count = fields.Integer(string='Queries', readonly=True)
+    row_count = fields.Integer(string='Rows Read', readonly=True)
+    batch_size = fields.Integer(readonly=True)
+    budget_ids = fields.Many2many(
+        comodel_name='crossovered.budget', string='Budgets', readonly=True)
+    general_budget_ids = fields.Many2many(
+        comodel_name='account.budget.post', string='Budgetary Positions',
+        readonly=True)
+    analytic_account_ids = fields.Many2many(
+        comodel_name='account.analytic.account', string='Analytic Accounts',
+        readonly=True)
+
+    @api.model
+    def _cron_purge(self, days=None):
+        """Delete the statistics older than ``days``, defaulting to the
+        ``account_budget_oca.profiling_retention_days`` system parameter.
+        """
+        if days is None:
+            days = int(self.env['ir.config_parameter'].sudo().get_param(
+                'account_budget_oca.profiling_retention_days', 30))
+        limit = fields.Datetime.now() - timedelta(days=days)
+        self.search([('create_date', '<', limit)]).unlink()
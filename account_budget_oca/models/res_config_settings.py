@@ -0,0 +1,24 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    budget_actuals_mode = fields.Selection(
+        selection=[('live', 'Computed on the fly'),
+                   ('stored', 'Stored and updated with the journal'),
+                   ('summary', 'Read from daily totals refreshed hourly')],
+        string='Budget Actuals', default='live', required=True,
+        config_parameter='account_budget_oca.actuals_mode')
+
+    @api.multi
+    def set_values(self):
+        budget_line_obj = self.env['crossovered.budget.lines']
+        previous_mode = budget_line_obj._get_actuals_mode()
+        super(ResConfigSettings, self).set_values()
+        if self.budget_actuals_mode != previous_mode:
+            # Incremental updates were not applied until now
+            budget_line_obj.sudo().search([])._refresh_stored_actuals()
+            self.env['account.budget.daily.actual'].sudo()._refresh()
@@ -0,0 +1,4 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from . import crossovered_budget_report
+from . import crossovered_budget_group_report
@@ -0,0 +1,140 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+from odoo import api, fields, models
+
+from ..models.account_budget import _LINE_AMOUNTS_QUERY
+from ..models.budget_matview import create_view, is_populated, refresh_view
+
+_logger = logging.getLogger(__name__)
+
+
+class CrossoveredBudgetGroupReport(models.Model):
+    """Budget vs actual of every budget rolled up the analytic group tree:
+    each row holds the subtotals of a group, its sub-groups included.
+
+    The subtotals of all the nodes are computed at once by a recursive
+    query and materialized, so that drilling down the tree only reads the
+    rows of the sub-groups. It reflects the journal as of its last refresh.
+    """
+    _name = "crossovered.budget.group.report"
+    _description = "Budget Analysis by Analytic Group"
+    _auto = False
+    _rec_name = 'group_id'
+    _order = 'crossovered_budget_id, group_id'
+
+    crossovered_budget_id = fields.Many2one(
+        comodel_name='crossovered.budget', string='Budget', readonly=True)
+    group_id = fields.Many2one(
+        comodel_name='account.analytic.group', string='Analytic Group',
+        readonly=True)
+    parent_id = fields.Many2one(
+        comodel_name='account.analytic.group', string='Parent Group',
+        readonly=True)
+    company_id = fields.Many2one(
+        comodel_name='res.company', string='Company', readonly=True)
+    line_count = fields.Integer(string='Budget Lines', readonly=True)
+    planned_amount = fields.Float(digits=0, readonly=True)
+    practical_amount = fields.Float(digits=0, readonly=True)
+    theoretical_amount = fields.Float(digits=0, readonly=True)
+    variance_amount = fields.Float(
+        digits=0, readonly=True,
+        help='Practical amount minus theoretical amount.')
+
+    @api.model_cr
+    def init(self):
+        create_view(self.env.cr, self._table, """
+            WITH RECURSIVE group_tree(group_id, ancestor_id) AS (
+                SELECT grp.id, grp.id
+                FROM account_analytic_group grp
+                UNION ALL
+                SELECT tree.group_id, grp.parent_id
+                FROM group_tree tree
+                JOIN account_analytic_group grp
+                    ON grp.id = tree.ancestor_id
+                WHERE grp.parent_id IS NOT NULL
+            ), line_amounts AS (
+                SELECT bl.crossovered_budget_id, bl.company_id,
+                    analytic.group_id, bl.planned_amount,
+                    amounts.practical_amount, amounts.theoretical_amount
+                FROM crossovered_budget_lines bl
+                JOIN account_analytic_account analytic
+                    ON analytic.id = bl.analytic_account_id
+                JOIN (%s) AS amounts ON amounts.line_id = bl.id
+                WHERE analytic.group_id IS NOT NULL
+            )
+            SELECT row_number() OVER (
+                    ORDER BY line.crossovered_budget_id, tree.ancestor_id
+                ) AS id,
+                line.crossovered_budget_id, tree.ancestor_id AS group_id,
+                grp.parent_id, line.company_id,
+                COUNT(*) AS line_count,
+                SUM(line.planned_amount) AS planned_amount,
+                SUM(line.practical_amount) AS practical_amount,
+                SUM(line.theoretical_amount) AS theoretical_amount,
+                SUM(line.practical_amount - line.theoretical_amount)
+                    AS variance_amount
+            FROM line_amounts line
+            JOIN group_tree tree ON tree.group_id = line.group_id
+            JOIN account_analytic_group grp ON grp.id = tree.ancestor_id
+            GROUP BY line.crossovered_budget_id, tree.ancestor_id,
+                grp.parent_id, line.company_id""" % _LINE_AMOUNTS_QUERY)
+        self.env.cr.execute(
+            "CREATE UNIQUE INDEX %s_id_index ON %s (id)"
+            % (self._table, self._table))
+        self.env.cr.execute(
+            "CREATE INDEX %s_parent_index ON %s (parent_id, "
+            "crossovered_budget_id)" % (self._table, self._table))
+
+    @api.model
+    def _is_populated(self):
+        return is_populated(self.env.cr, self._table)
+
+    @api.model
+    def _refresh(self):
+        _logger.info('Refreshing budget analysis by analytic group')
+        refresh_view(self.env.cr, self._table)
+        self.invalidate_cache()
+
+    @api.model
+    def _populate(self):
+        """Fill the rollup, and the detailed analysis it goes with, if they
+        were never refreshed.
+        """
+        if not self._is_populated():
+            self.env['crossovered.budget.report']._refresh()
+
+    @api.model
+    def action_open(self):
+        self._populate()
+        return self.env.ref(
+            'account_budget_oca.action_crossovered_budget_group_report'
+        ).read()[0]
+
+    @api.model
+    def get_children(self, budget_ids, group_id=False):
+        """Return the subtotals of the sub-groups of an analytic group, or of
+        the top-level groups, for the given budgets.
+        """
+        self._populate()
+        return self.search_read(
+            [('crossovered_budget_id', 'in', budget_ids),
+             ('parent_id', '=', group_id)],
+            ['crossovered_budget_id', 'group_id', 'line_count',
+             'planned_amount', 'practical_amount', 'theoretical_amount',
+             'variance_amount'])
+
+    @api.multi
+    def action_drill_down(self):
+        """Open the subtotals of the sub-groups of the row."""
+        self.ensure_one()
+        action = self.env.ref(
+            'account_budget_oca.action_crossovered_budget_group_report'
+        ).read()[0]
+        action['domain'] = [
+            ('crossovered_budget_id', '=', self.crossovered_budget_id.id),
+            ('parent_id', '=', self.group_id.id)]
+        action['context'] = {}
+        action['name'] = self.group_id.display_name
+        return action
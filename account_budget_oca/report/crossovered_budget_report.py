@@ -0,0 +1,93 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+from odoo import api, fields, models
+
+from ..models.account_budget import _LINE_AMOUNTS_QUERY
+from ..models.budget_matview import create_view, is_populated, refresh_view
+
+_logger = logging.getLogger(__name__)
+
+
+class CrossoveredBudgetReport(models.Model):
+    """Budget vs actual of every budget line, materialized so that it can be
+    grouped in the database. It reflects the journal as of its last
+    refresh.
+    """
+    _name = "crossovered.budget.report"
+    _description = "Budget Analysis"
+    _auto = False
+    _rec_name = 'crossovered_budget_id'
+    _order = 'date desc'
+
+    crossovered_budget_id = fields.Many2one(
+        comodel_name='crossovered.budget', string='Budget', readonly=True)
+    general_budget_id = fields.Many2one(
+        comodel_name='account.budget.post', string='Budgetary Position',
+        readonly=True)
+    analytic_account_id = fields.Many2one(
+        comodel_name='account.analytic.account', string='Analytic Account',
+        readonly=True)
+    company_id = fields.Many2one(
+        comodel_name='res.company', string='Company', readonly=True)
+    state = fields.Selection(
+        selection=[('draft', 'Draft'),
+                   ('cancel', 'Cancelled'),
+                   ('confirm', 'Confirmed'),
+                   ('validate', 'Validated'),
+                   ('done', 'Done')],
+        string='Status', readonly=True)
+    date = fields.Date(string='Start Date', readonly=True)
+    date_to = fields.Date(string='End Date', readonly=True)
+    planned_amount = fields.Float(digits=0, readonly=True)
+    practical_amount = fields.Float(digits=0, readonly=True)
+    theoretical_amount = fields.Float(digits=0, readonly=True)
+    variance_amount = fields.Float(
+        digits=0, readonly=True,
+        help='Practical amount minus theoretical amount.')
+
+    @api.model_cr
+    def init(self):
+        create_view(self.env.cr, self._table, """
+            SELECT bl.id, bl.crossovered_budget_id, bl.general_budget_id,
+                bl.analytic_account_id, bl.company_id, budget.state,
+                bl.date_from AS date, bl.date_to, bl.planned_amount,
+                amounts.practical_amount, amounts.theoretical_amount,
+                amounts.practical_amount - amounts.theoretical_amount
+                    AS variance_amount
+            FROM crossovered_budget_lines bl
+            JOIN crossovered_budget budget
+                ON budget.id = bl.crossovered_budget_id
+            JOIN (%s) AS amounts ON amounts.line_id = bl.id""" % (
+            _LINE_AMOUNTS_QUERY,))
+        self.env.cr.execute(
+            "CREATE UNIQUE INDEX %s_id_index ON %s (id)"
+            % (self._table, self._table))
+
+    @api.model
+    def _is_populated(self):
+        return is_populated(self.env.cr, self._table)
+
+    @api.model
+    def _refresh(self):
+        _logger.info('Refreshing budget analysis')
+        refresh_view(self.env.cr, self._table)
+        self.invalidate_cache()
+        # Keep the rollup consistent with the detailed analysis
+        self.env['crossovered.budget.group.report']._refresh()
+
+    @api.model
+    def action_open(self):
+        """Open the analysis, filling it first if it was never refreshed."""
+        if not self._is_populated():
+            self._refresh()
+        return self.env.ref(
+            'account_budget_oca.action_crossovered_budget_report').read()[0]
+
+    @api.model
+    def action_refresh(self):
+        """Refresh the analysis and open it."""
+        self._refresh()
+        return self.env.ref(
+            'account_budget_oca.action_crossovered_budget_report').read()[0]
@@ -3,3 +3,5 @@
 from . import common
 from . import test_theoreticalamount
 from . import test_account_budget
+from . import test_benchmark
+from . import test_query_count
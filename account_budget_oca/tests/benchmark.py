@@ -0,0 +1,174 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+"""Helpers of the budget benchmarks: a seeded data generator and a recorder
+of timings and query counts.
+
+The benchmarks are tagged ``budget_benchmark`` and excluded from the
+standard test runs. Run them with ``--test-tags budget_benchmark``; set the
+``BUDGET_BENCHMARK_OUTPUT`` environment variable to a file path to append
+the results to it, one JSON object per line.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+_logger = logging.getLogger(__name__)
+
+
+class BudgetBenchmarkData(object):
+    """Generate budget data with a seeded random generator, so that two
+    runs measure the same data set.
+    """
+
+    def __init__(self, env, seed=42, year=None):
+        self.env = env
+        self.random = random.Random(seed)
+        self.year = year or date.today().year
+        self.date_from = date(self.year, 1, 1)
+        self.date_to = date(self.year, 12, 31)
+        self._sequence = 0
+
+    def _next_code(self, prefix):
+        self._sequence += 1
+        return '%s%05d' % (prefix, self._sequence)
+
+    def create_accounts(self, count):
+        return self.env['account.account'].create([{
+            'name': 'Benchmark Revenue',
+            'code': self._next_code('BR'),
+            'user_type_id': self.env.ref(
+                'account.data_account_type_revenue').id,
+        } for dummy in range(count)])
+
+    def create_positions(self, count, accounts_per_position=3):
+        accounts = self.create_accounts(count * accounts_per_position)
+        return self.env['account.budget.post'].create([{
+            'name': 'Benchmark Position %s' % index,
+            'account_ids': [(6, 0, accounts[
+                index * accounts_per_position:
+                (index + 1) * accounts_per_position].ids)],
+        } for index in range(count)])
+
+    def create_analytic_accounts(self, count):
+        return self.env['account.analytic.account'].create([{
+            'name': 'Benchmark Analytic %s' % index,
+        } for index in range(count)])
+
+    def _random_date(self):
+        return self.date_from + relativedelta(
+            days=self.random.randint(
+                0, (self.date_to - self.date_from).days))
+
+    def create_moves(self, positions, analytic_accounts, count,
+                     lines_per_move=10):
+        """Post ``count`` entries of ``lines_per_move`` items on the accounts
+        of the positions, half of them with an analytic account. The
+        analytic lines are created on posting.
+        """
+        accounts = positions.mapped('account_ids')
+        journal = self.env['account.journal'].create({
+            'name': 'Benchmark Journal',
+            'code': self._next_code('J')[-5:],
+            'type': 'general',
+        })
+        counterpart = self.env['account.account'].create({
+            'name': 'Benchmark Counterpart',
+            'code': self._next_code('BC'),
+            'user_type_id': self.env.ref(
+                'account.data_account_type_current_assets').id,
+        })
+        moves = self.env['account.move']
+        for dummy in range(count):
+            amounts = [round(self.random.uniform(1, 1000), 2)
+                       for dummy in range(lines_per_move)]
+            line_vals = [(0, 0, {
+                'name': 'Benchmark',
+                'account_id': self.random.choice(accounts).id,
+                'analytic_account_id': (
+                    self.random.random() < 0.5 and
+                    self.random.choice(analytic_accounts).id),
+                'credit': amount,
+            }) for amount in amounts]
+            line_vals.append((0, 0, {
+                'name': 'Benchmark',
+                'account_id': counterpart.id,
+                'debit': sum(amounts),
+            }))
+            moves |= moves.create({
+                'journal_id': journal.id,
+                'date': self._random_date(),
+                'line_ids': line_vals,
+            })
+        moves.post()
+        return moves
+
+    def create_budgets(self, positions, analytic_accounts, count,
+                       lines_per_budget, months=1):
+        """Create ``count`` budgets of ``lines_per_budget`` lines over
+        periods of ``months`` months, half of them analytic.
+        """
+        budgets = self.env['crossovered.budget'].with_context(
+            tracking_disable=True).create([{
+                'name': 'Benchmark Budget %s' % index,
+                'date_from': self.date_from,
+                'date_to': self.date_to,
+            } for index in range(count)])
+        vals_list = []
+        for budget in budgets:
+            for dummy in range(lines_per_budget):
+                start = self.date_from + relativedelta(
+                    months=self.random.randint(0, 12 - months))
+                vals_list.append({
+                    'crossovered_budget_id': budget.id,
+                    'general_budget_id': self.random.choice(positions).id,
+                    'analytic_account_id': (
+                        self.random.random() < 0.5 and
+                        self.random.choice(analytic_accounts).id),
+                    'date_from': start,
+                    'date_to': start + relativedelta(months=months, days=-1),
+                    'planned_amount': round(
+                        self.random.uniform(1000, 100000), 2),
+                })
+        self.env['crossovered.budget.lines'].create(vals_list)
+        return budgets
+
+
+class BudgetBenchmarkRecorder(object):
+    """Record the wall time and the number of SQL queries of measured
+    blocks, and write them out as JSON.
+    """
+
+    def __init__(self, cr, suite):
+        self.cr = cr
+        self.suite = suite
+        self.results = []
+
+    @contextmanager
+    def measure(self, name, **params):
+        queries = self.cr.sql_log_count
+        start = time.perf_counter()
+        yield
+        result = {
+            'suite': self.suite,
+            'name': name,
+            'params': params,
+            'duration': time.perf_counter() - start,
+            'queries': self.cr.sql_log_count - queries,
+        }
+        _logger.info('Benchmark %(suite)s.%(name)s %(params)s: '
+                     '%(duration).4fs, %(queries)s queries', result)
+        self.results.append(result)
+
+    def dump(self):
+        path = os.environ.get('BUDGET_BENCHMARK_OUTPUT')
+        if not path:
+            return
+        with open(path, 'a') as output:
+            for result in self.results:
+                output.write(json.dumps(result, sort_keys=True) + '\n')
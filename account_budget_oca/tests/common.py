@@ -216,3 +216,68 @@ class TestAccountBudgetCommon(AccountingTestCase):
             'crossovered_budget_id': self.ref(
                 'account_budget_oca.crossovered_budget_budgetoptimistic0'),
         })
+
+    def _create_budget_post(self, code):
+        """Create a budgetary position on a new revenue account."""
+        account = self.account_model.create({
+            'name': 'Budget - Test Revenue %s' % code,
+            'code': code,
+            'user_type_id': self.ref('account.data_account_type_revenue'),
+        })
+        return self.env['account.budget.post'].create({
+            'name': 'Test Sales %s' % code,
+            'account_ids': [(6, 0, account.ids)],
+        })
+
+    def _create_budget_line(self, post, date_from, date_to, **kw):
+        """Create a line of ``post``, in the optimistic demo budget unless
+        another ``crossovered_budget_id`` is given.
+        """
+        vals = {
+            'crossovered_budget_id': self.ref(
+                'account_budget_oca.crossovered_budget_budgetoptimistic0'),
+            'general_budget_id': post.id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'planned_amount': 100.0,
+        }
+        vals.update(kw)
+        return self.budget_lines_model.create(vals)
+
+    def _create_move(self, account, amount, date, analytic_account=False):
+        """Post a journal entry crediting ``amount`` on ``account``."""
+        if not hasattr(self, 'test_journal'):
+            self.test_journal = self.env['account.journal'].create({
+                'name': 'Budget - Test Journal',
+                'code': 'XBTJ',
+                'type': 'general',
+                'update_posted': True,
+            })
+            self.test_counterpart_account = self.account_model.create({
+                'name': 'Budget - Test Counterpart',
+                'code': 'XB100',
+                'user_type_id': self.ref(
+                    'account.data_account_type_current_assets'),
+            })
+        move = self.env['account.move'].create({
+            'journal_id': self.test_journal.id,
+            'date': date,
+            'line_ids': [
+                (0, 0, {
+                    'name': 'Budget test',
+                    'account_id': account.id,
+                    'analytic_account_id': analytic_account and
+                    analytic_account.id,
+                    'credit': amount > 0 and amount or 0.0,
+                    'debit': amount < 0 and -amount or 0.0,
+                }),
+                (0, 0, {
+                    'name': 'Budget test',
+                    'account_id': self.test_counterpart_account.id,
+                    'credit': amount < 0 and -amount or 0.0,
+                    'debit': amount > 0 and amount or 0.0,
+                }),
+            ],
+        })
+        move.post()
+        return move
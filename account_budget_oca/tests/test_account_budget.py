@@ -1,9 +1,14 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from .common import TestAccountBudgetCommon
+from ..models.account_budget import _partition
 from odoo.fields import Date
+from odoo.exceptions import UserError, ValidationError
 
+import base64
+import csv
 import datetime
+import io
 
 
 # ---------------------------------------------------------
@@ -70,3 +75,503 @@ class TestAccountBudget(TestAccountBudgetCommon):
 
         # I check that budget is in "done" state
         self.assertEqual(budget.state, 'done')
+
+    def test_practical_amount(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB200')
+        account = post.account_ids
+        analytic_account = self.env['account.analytic.account'].create({
+            'name': 'Budget - Test Analytic',
+        })
+        self._create_move(
+            account, 100.0, '%s-03-10' % year, analytic_account)
+        self._create_move(account, 40.0, '%s-03-20' % year)
+        general_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year, planned_amount=500.0)
+        analytic_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year, planned_amount=500.0,
+            analytic_account_id=analytic_account.id)
+        other_line = self._create_budget_line(
+            post, '%s-04-01' % year, '%s-04-30' % year, planned_amount=500.0)
+        lines = general_line | analytic_line | other_line
+        self.assertEqual(
+            lines.mapped('practical_amount'), [140.0, 100.0, 0.0])
+
+    def test_stored_practical_amount(self):
+        self.env['ir.config_parameter'].set_param(
+            'account_budget_oca.actuals_mode', 'stored')
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB201')
+        account = post.account_ids
+        analytic_account = self.env['account.analytic.account'].create({
+            'name': 'Budget - Test Analytic',
+        })
+        general_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year, planned_amount=500.0)
+        analytic_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year, planned_amount=500.0,
+            analytic_account_id=analytic_account.id)
+        lines = general_line | analytic_line
+        self.assertEqual(lines.mapped('stored_practical_amount'), [0.0, 0.0])
+        move = self._create_move(
+            account, 100.0, '%s-03-10' % year, analytic_account)
+        self._create_move(account, 40.0, '%s-04-10' % year)
+        self.assertEqual(
+            lines.mapped('stored_practical_amount'), [100.0, 100.0])
+        self.assertEqual(lines.mapped('practical_amount'), [100.0, 100.0])
+        # Moving the entry out of the budget period removes its amount
+        move.button_cancel()
+        move.write({'date': '%s-04-10' % year})
+        self.assertEqual(
+            lines.mapped('stored_practical_amount'), [0.0, 0.0])
+        # Widening the line period takes the existing entries into account
+        general_line.date_to = '%s-04-30' % year
+        self.assertEqual(general_line.stored_practical_amount, 140.0)
+        move.unlink()
+        self.assertEqual(general_line.stored_practical_amount, 40.0)
+        self.assertEqual(
+            general_line.stored_practical_amount,
+            general_line.practical_amount)
+
+    def test_summary_practical_amount(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB202')
+        account = post.account_ids
+        analytic_account = self.env['account.analytic.account'].create({
+            'name': 'Budget - Test Analytic',
+        })
+        self._create_move(
+            account, 100.0, '%s-02-28' % year, analytic_account)
+        self._create_move(account, 40.0, '%s-03-01' % year)
+        self._create_move(account, 25.0, '%s-03-31' % year)
+        self._create_move(account, 10.0, '%s-04-01' % year)
+        lines = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year, planned_amount=500.0)
+        lines |= self._create_budget_line(
+            post, '%s-02-01' % year, '%s-03-31' % year, planned_amount=500.0)
+        lines |= self._create_budget_line(
+            post, '%s-02-01' % year, '%s-03-31' % year, planned_amount=500.0,
+            analytic_account_id=analytic_account.id)
+        self.assertEqual(
+            lines.mapped('practical_amount'), [65.0, 165.0, 100.0])
+        self.env['ir.config_parameter'].set_param(
+            'account_budget_oca.actuals_mode', 'summary')
+        # Read from the journal until the daily actuals are filled
+        lines.invalidate_cache()
+        self.assertEqual(
+            lines.mapped('practical_amount'), [65.0, 165.0, 100.0])
+        self.env['account.budget.daily.actual']._refresh()
+        lines.invalidate_cache()
+        self.assertEqual(
+            lines.mapped('practical_amount'), [65.0, 165.0, 100.0])
+
+    def test_done_budget_snapshot(self):
+        year = datetime.datetime.now().year - 1
+        post = self._create_budget_post('XB203')
+        account = post.account_ids
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Closed Budget',
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+        })
+        line = self._create_budget_line(
+            post, '%s-01-01' % year, '%s-12-31' % year,
+            crossovered_budget_id=budget.id, planned_amount=200.0)
+        self._create_move(account, 50.0, '%s-06-15' % year)
+        budget.action_budget_confirm()
+        budget.action_budget_validate()
+        budget.action_budget_done()
+        self.assertTrue(line.snapshot_date)
+        self.assertEqual(line.snapshot_practical_amount, 50.0)
+        self.assertEqual(line.snapshot_theoretical_amount, 200.0)
+        self.assertEqual(line.snapshot_percentage, 25.0)
+        # Back-posting into the closed period does not change the budget
+        self._create_move(account, 30.0, '%s-07-15' % year)
+        line.invalidate_cache()
+        self.assertEqual(line.practical_amount, 50.0)
+        self.assertEqual(line.percentage, 25.0)
+
+    def test_budget_report(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB204')
+        self._create_move(post.account_ids, 70.0, '%s-03-10' % year)
+        self._create_budget_line(post, '%s-03-01' % year, '%s-03-31' % year)
+        self._create_budget_line(post, '%s-04-01' % year, '%s-04-30' % year)
+        report_obj = self.env['crossovered.budget.report']
+        report_obj._refresh()
+        result = report_obj.read_group(
+            [('general_budget_id', '=', post.id)],
+            ['planned_amount', 'practical_amount', 'theoretical_amount'],
+            ['general_budget_id'])
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['planned_amount'], 200.0)
+        self.assertEqual(result[0]['practical_amount'], 70.0)
+        self.assertEqual(result[0]['theoretical_amount'], 0.0)
+
+    def test_budget_post_account_cache(self):
+        post = self._create_budget_post('XB205')
+        self.assertEqual(post._get_account_ids(), post.account_ids.ids)
+        account = self.account_model.create({
+            'name': 'Budget - Test Revenue XB206',
+            'code': 'XB206',
+            'user_type_id': self.ref('account.data_account_type_revenue'),
+        })
+        post.write({'account_ids': [(4, account.id)]})
+        self.assertEqual(
+            sorted(post._get_account_ids()), sorted(post.account_ids.ids))
+
+    def test_profiling(self):
+        lines = self.budget_lines_model.search([
+            ('general_budget_id', '=', self.account_budget_post_sales0.id)])
+        stat_obj = self.env['crossovered.budget.stat']
+        self.assertFalse(stat_obj.search([]))
+        lines.with_context(budget_profiling=True).mapped('practical_amount')
+        stat = stat_obj.search([('name', '=', 'practical_amount')])
+        self.assertEqual(len(stat), 1)
+        self.assertEqual(stat.batch_size, len(lines))
+        self.assertTrue(stat.query_count)
+        self.assertEqual(
+            stat.general_budget_ids, self.account_budget_post_sales0)
+        stat_obj._cron_purge()
+        self.assertTrue(stat.exists())
+        stat_obj._cron_purge(days=-1)
+        self.assertFalse(stat.exists())
+
+    def test_cron_refresh_actuals(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB207')
+        line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year)
+        self._create_move(post.account_ids, 30.0, '%s-03-10' % year)
+        # Journal items posted before switching to the stored mode
+        self.env['ir.config_parameter'].set_param(
+            'account_budget_oca.actuals_mode', 'stored')
+        self.assertEqual(line.stored_practical_amount, 0.0)
+        budget_obj = self.env['crossovered.budget']
+        budget_obj._cron_refresh_actuals(batch_size=1)
+        self.assertEqual(line.stored_practical_amount, 30.0)
+        self.assertTrue(line.crossovered_budget_id.actuals_refresh_date)
+        self.assertFalse(self.env['ir.config_parameter'].get_param(
+            'account_budget_oca.actuals_refresh_start'))
+
+    def test_refresh_actuals_partitions(self):
+        self.assertEqual(_partition([], 4), [])
+        self.assertEqual(_partition([1, 2], 4), [[1], [2]])
+        self.assertEqual(
+            _partition([1, 2, 3, 4, 5], 2), [[1, 2, 3], [4, 5]])
+        # Nothing left to refresh
+        self.env['crossovered.budget']._refresh_actuals_parallel([], 10, 4)
+
+    def test_search_amounts(self):
+        year = datetime.datetime.now().year - 1
+        post = self._create_budget_post('XB208')
+        self._create_move(post.account_ids, 150.0, '%s-03-10' % year)
+        self._create_move(post.account_ids, 20.0, '%s-04-10' % year)
+        over_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year)
+        under_line = self._create_budget_line(
+            post, '%s-04-01' % year, '%s-04-30' % year)
+        empty_line = self._create_budget_line(
+            post, '%s-05-01' % year, '%s-05-31' % year)
+        domain = [('general_budget_id', '=', post.id)]
+        self.assertEqual(self.budget_lines_model.search(
+            domain + [('percentage', '>', 100)]), over_line)
+        self.assertEqual(self.budget_lines_model.search(
+            domain + [('percentage', '<', 100),
+                      ('theoretical_amount', '!=', 0)]),
+            under_line | empty_line)
+        self.assertEqual(self.budget_lines_model.search(
+            domain + [('practical_amount', '=', 0)]), empty_line)
+        self.assertEqual(self.budget_lines_model.search(
+            domain + [('practical_amount', '>=', 20)]),
+            over_line | under_line)
+        # The stored amounts are searched in the stored actuals mode
+        self.env['ir.config_parameter'].set_param(
+            'account_budget_oca.actuals_mode', 'stored')
+        self.assertFalse(self.budget_lines_model.search(
+            domain + [('practical_amount', '>=', 20)]))
+        self.env['crossovered.budget']._cron_refresh_actuals()
+        self.assertEqual(self.budget_lines_model.search(
+            domain + [('practical_amount', '>=', 20)]),
+            over_line | under_line)
+
+    def test_export_lines(self):
+        year = datetime.datetime.now().year - 1
+        post = self._create_budget_post('XB209')
+        self._create_move(post.account_ids, 40.0, '%s-02-10' % year)
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Export Budget',
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+        })
+        for month in (1, 2, 3):
+            self._create_budget_line(
+                post, '%s-%02d-01' % (year, month),
+                '%s-%02d-28' % (year, month), crossovered_budget_id=budget.id)
+        rows = list(budget._iter_export_rows(chunk_size=2))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([row[7] for row in rows], [0.0, 40.0, 0.0])
+        fileobj = io.BytesIO()
+        budget._export_lines(fileobj, 'csv')
+        reader = csv.reader(io.StringIO(fileobj.getvalue().decode('utf-8')))
+        header, first_row = next(reader), next(reader)
+        self.assertEqual(len(header), 10)
+        self.assertEqual(first_row[:3], ['Export Budget', post.name, ''])
+        self.assertEqual(len(list(reader)), 2)
+
+    def _import_lines(self, budget, rows, **kwargs):
+        content = '\n'.join(
+            ['general_budget_id,analytic_account_id,date_from,date_to,'
+             'planned_amount'] + rows)
+        wizard = self.env['crossovered.budget.lines.import'].with_context(
+            active_model='crossovered.budget', active_id=budget.id).create(
+            dict(kwargs, data_file=base64.b64encode(content.encode())))
+        return wizard.action_import()
+
+    def test_import_lines(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB210')
+        analytic_account = self.env['account.analytic.account'].create({
+            'name': 'Budget - Import Analytic',
+            'code': 'XBIMP',
+        })
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Import Budget',
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+        })
+        self._import_lines(budget, [
+            '%s,,%s-01-01,%s-01-31,100' % (post.name, year, year),
+            '%s,XBIMP,%s-01-01,%s-01-31,50' % (post.name, year, year),
+        ])
+        lines = budget.crossovered_budget_line_ids
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            lines.filtered('analytic_account_id').analytic_account_id,
+            analytic_account)
+        # The planned amount of the matching line is updated
+        self._import_lines(budget, [
+            '%s,Budget - Import Analytic,%s-01-01,%s-01-31,75' % (
+                post.name, year, year),
+            '%s,,%s-02-01,%s-02-28,100' % (post.name, year, year),
+        ])
+        budget.invalidate_cache()
+        lines = budget.crossovered_budget_line_ids
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(sorted(lines.mapped('planned_amount')),
+                         [75.0, 100.0, 100.0])
+        with self.assertRaises(UserError):
+            self._import_lines(budget, [
+                'Unknown Position,,%s-03-01,%s-03-31,10' % (year, year),
+                '%s,,not a date,%s-03-31,10' % (post.name, year),
+            ])
+        self.assertEqual(len(budget.crossovered_budget_line_ids), 3)
+
+    def test_roll_forward(self):
+        post = self._create_budget_post('XB211')
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Budget 2019',
+            'date_from': '2019-01-01',
+            'date_to': '2019-12-31',
+        })
+        for date_from, date_to in (('2019-01-01', '2019-01-31'),
+                                   ('2019-02-01', '2019-02-28'),
+                                   ('2019-03-10', '2019-03-20')):
+            self._create_budget_line(
+                post, date_from, date_to, crossovered_budget_id=budget.id)
+        new_budget = budget._roll_forward(months=13, factor=1.5)
+        self.assertEqual(new_budget.name, 'Budget 2020')
+        self.assertEqual(str(new_budget.date_from), '2020-02-01')
+        self.assertEqual(str(new_budget.date_to), '2021-01-31')
+        lines = new_budget.crossovered_budget_line_ids.sorted('date_from')
+        self.assertEqual(
+            [(str(line.date_from), str(line.date_to)) for line in lines],
+            [('2020-02-01', '2020-02-29'), ('2020-03-01', '2020-03-31'),
+             ('2020-04-10', '2020-04-20')])
+        self.assertEqual(lines.mapped('planned_amount'), [150.0] * 3)
+        self.assertEqual(lines.mapped('general_budget_id'), post)
+        # Duplicating copies the lines as they are
+        copied_lines = budget.copy().crossovered_budget_line_ids
+        self.assertEqual(
+            sorted(copied_lines.mapped('date_from')),
+            sorted(budget.crossovered_budget_line_ids.mapped('date_from')))
+        self.assertEqual(copied_lines.mapped('planned_amount'), [100.0] * 3)
+
+    def test_budget_group_report(self):
+        year = datetime.datetime.now().year - 1
+        post = self._create_budget_post('XB212')
+        group_obj = self.env['account.analytic.group']
+        root = group_obj.create({'name': 'Budget - Root Group'})
+        child = group_obj.create({
+            'name': 'Budget - Child Group',
+            'parent_id': root.id,
+        })
+        root_account, child_account = self.env[
+            'account.analytic.account'].create([
+                {'name': 'Budget - Root Analytic', 'group_id': root.id},
+                {'name': 'Budget - Child Analytic', 'group_id': child.id},
+            ])
+        self._create_move(
+            post.account_ids, 30.0, '%s-03-10' % year, root_account)
+        self._create_move(
+            post.account_ids, 50.0, '%s-03-10' % year, child_account)
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Group Budget',
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+        })
+        for analytic_account in (root_account, child_account):
+            self._create_budget_line(
+                post, '%s-03-01' % year, '%s-03-31' % year,
+                crossovered_budget_id=budget.id,
+                analytic_account_id=analytic_account.id)
+        report_obj = self.env['crossovered.budget.group.report']
+        self.env['crossovered.budget.report']._refresh()
+        top_level = report_obj.get_children(budget.ids)
+        self.assertEqual(len(top_level), 1)
+        self.assertEqual(top_level[0]['group_id'][0], root.id)
+        self.assertEqual(top_level[0]['line_count'], 2)
+        self.assertEqual(top_level[0]['planned_amount'], 200.0)
+        self.assertEqual(top_level[0]['practical_amount'], 80.0)
+        children = report_obj.get_children(budget.ids, root.id)
+        self.assertEqual(len(children), 1)
+        self.assertEqual(children[0]['group_id'][0], child.id)
+        self.assertEqual(children[0]['practical_amount'], 50.0)
+
+    def test_find_covering_lines(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB213')
+        analytic_account = self.env['account.analytic.account'].create({
+            'name': 'Budget - Covering Analytic',
+        })
+        general_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year)
+        analytic_line = self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year,
+            analytic_account_id=analytic_account.id)
+        self._create_budget_line(post, '%s-04-01' % year, '%s-04-30' % year)
+        move = self._create_move(
+            post.account_ids, 10.0, '%s-03-31' % year, analytic_account)
+        other_move = self._create_move(
+            post.account_ids, 10.0, '%s-05-01' % year)
+        move_lines = (move | other_move).mapped('line_ids')
+        revenue_line = move.line_ids.filtered(
+            lambda l: l.account_id == post.account_ids)
+        self.assertEqual(
+            self.budget_lines_model._find_covering_lines(move_lines),
+            {revenue_line.id: [general_line.id, analytic_line.id]})
+
+    def test_inverted_dates(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB217')
+        with self.assertRaises(ValidationError), self.cr.savepoint():
+            self._create_budget_line(
+                post, '%s-03-31' % year, '%s-03-01' % year)
+
+    def test_budget_control(self):
+        year = datetime.datetime.now().year + 1
+        post = self._create_budget_post('XB214')
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Controlled Budget',
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+        })
+        self._create_budget_line(
+            post, '%s-03-01' % year, '%s-03-31' % year,
+            crossovered_budget_id=budget.id)
+        budget.action_budget_confirm()
+        post.budget_control = 'block'
+        self._create_move(post.account_ids, 80.0, '%s-03-10' % year)
+        with self.assertRaises(UserError), self.cr.savepoint():
+            self._create_move(post.account_ids, 30.0, '%s-03-20' % year)
+        # Moves decreasing the practical amount are always allowed
+        self._create_move(post.account_ids, -10.0, '%s-03-20' % year)
+        post.budget_control = 'warning'
+        message_count = len(budget.message_ids)
+        self._create_move(post.account_ids, 50.0, '%s-03-20' % year)
+        self.assertEqual(len(budget.message_ids), message_count + 1)
+
+    def test_cash_basis_practical_amount(self):
+        year = datetime.datetime.now().year - 1
+        post = self._create_budget_post('XB215')
+        receivable = self.account_model.create({
+            'name': 'Budget - Test Receivable',
+            'code': 'XB101',
+            'user_type_id': self.ref('account.data_account_type_receivable'),
+            'reconcile': True,
+        })
+        bank = self.account_model.create({
+            'name': 'Budget - Test Bank',
+            'code': 'XB102',
+            'user_type_id': self.ref('account.data_account_type_liquidity'),
+        })
+        journal = self.env['account.journal'].create({
+            'name': 'Budget - Cash Basis Journal',
+            'code': 'XBCJ',
+            'type': 'general',
+        })
+        to_reconcile = self.env['account.move.line']
+        for date, lines in (
+                ('%s-03-10' % year, [(post.account_ids, 100.0),
+                                     (receivable, -100.0)]),
+                ('%s-05-05' % year, [(receivable, 60.0), (bank, -60.0)])):
+            move = self.env['account.move'].create({
+                'journal_id': journal.id,
+                'date': date,
+                'line_ids': [(0, 0, {
+                    'name': 'Budget cash basis test',
+                    'account_id': account.id,
+                    'credit': amount > 0 and amount or 0.0,
+                    'debit': amount < 0 and -amount or 0.0,
+                }) for account, amount in lines],
+            })
+            move.post()
+            to_reconcile |= move.line_ids.filtered(
+                lambda l: l.account_id == receivable)
+        to_reconcile.reconcile()
+        budgets = self.env['crossovered.budget'].create([{
+            'name': 'Budget %s' % basis,
+            'date_from': '%s-01-01' % year,
+            'date_to': '%s-12-31' % year,
+            'actuals_basis': basis,
+        } for basis in ('accrual', 'cash')])
+        for budget in budgets:
+            for month in (3, 5):
+                self._create_budget_line(
+                    post, '%s-%02d-01' % (year, month),
+                    '%s-%02d-28' % (year, month),
+                    crossovered_budget_id=budget.id)
+        accrual_lines, cash_lines = [
+            budget.crossovered_budget_line_ids.sorted('date_from')
+            for budget in budgets]
+        self.assertEqual(
+            accrual_lines.mapped('practical_amount'), [100.0, 0.0])
+        self.assertEqual(cash_lines.mapped('practical_amount'), [0.0, 60.0])
+
+    def test_forecast(self):
+        today = Date.context_today(self.env.user)
+        post = self._create_budget_post('XB216')
+        # The same amount in each month of the history
+        month = today.year * 12 + today.month - 1
+        for index in range(month - 24, month):
+            self._create_move(post.account_ids, 100.0, '%s-%02d-15' % (
+                index // 12, index % 12 + 1))
+        next_year = today.year + 1
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Forecast Budget',
+            'date_from': '%s-01-01' % next_year,
+            'date_to': '%s-12-31' % next_year,
+        })
+        future_line = self._create_budget_line(
+            post, '%s-01-01' % next_year, '%s-12-31' % next_year,
+            crossovered_budget_id=budget.id, planned_amount=1000.0)
+        past_line = self._create_budget_line(
+            post, '%s-%02d-01' % ((month - 2) // 12, (month - 2) % 12 + 1),
+            today.replace(day=1) - datetime.timedelta(days=1),
+            crossovered_budget_id=budget.id, planned_amount=1000.0)
+        budget.action_budget_confirm()
+        self.env['crossovered.budget']._cron_compute_forecast()
+        self.assertAlmostEqual(future_line.forecast_amount, 1200.0, 2)
+        self.assertAlmostEqual(past_line.forecast_amount, 200.0, 2)
+        self.assertAlmostEqual(budget.forecast_amount, 1400.0, 2)
+        self.assertTrue(budget.forecast_date)
@@ -0,0 +1,60 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo.tests import common, tagged
+
+from .benchmark import BudgetBenchmarkData, BudgetBenchmarkRecorder
+
+# (budgets, lines per budget, journal entries, months per line)
+SCENARIOS = [
+    (2, 50, 100, 1),
+    (10, 100, 500, 1),
+    (10, 100, 500, 3),
+    (20, 500, 1000, 12),
+]
+
+
+@tagged('post_install', '-at_install', '-standard', 'budget_benchmark')
+class TestBudgetBenchmark(common.TransactionCase):
+
+    def setUp(self):
+        super(TestBudgetBenchmark, self).setUp()
+        self.recorder = BudgetBenchmarkRecorder(self.cr, 'account_budget_oca')
+
+    def tearDown(self):
+        self.recorder.dump()
+        super(TestBudgetBenchmark, self).tearDown()
+
+    def _run_scenario(self, data, budget_count, line_count, move_count,
+                      months):
+        positions = data.create_positions(10)
+        analytic_accounts = data.create_analytic_accounts(10)
+        data.create_moves(positions, analytic_accounts, move_count)
+        budgets = data.create_budgets(
+            positions, analytic_accounts, budget_count, line_count, months)
+        lines = budgets.mapped('crossovered_budget_line_ids')
+        params = {
+            'budgets': budget_count,
+            'lines': len(lines),
+            'move_lines': move_count * 11,
+            'months': months,
+        }
+        lines.invalidate_cache()
+        with self.recorder.measure('practical_amount', **params):
+            lines.mapped('practical_amount')
+        with self.recorder.measure('theoretical_amount', **params):
+            lines.mapped('theoretical_amount')
+        lines.invalidate_cache(['percentage'])
+        with self.recorder.measure('percentage', **params):
+            lines.mapped('percentage')
+        for budget in budgets[:1]:
+            budget.invalidate_cache()
+            with self.recorder.measure('budget_form', **params):
+                budget.crossovered_budget_line_ids.read([
+                    'planned_amount', 'practical_amount',
+                    'theoretical_amount', 'percentage'])
+
+    def test_benchmark(self):
+        data = BudgetBenchmarkData(self.env)
+        for scenario in SCENARIOS:
+            self._run_scenario(data, *scenario)
+        self.assertEqual(len(self.recorder.results), 4 * len(SCENARIOS))
@@ -0,0 +1,76 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo.tests import common, tagged
+
+from .benchmark import BudgetBenchmarkData
+
+# Upper bound of the queries needed to read the amounts of budget lines,
+# whatever their number
+MAX_QUERIES = 10
+
+AMOUNT_FIELDS = [
+    'planned_amount', 'practical_amount', 'theoretical_amount', 'percentage',
+]
+
+
+@tagged('post_install', '-at_install')
+class TestBudgetQueryCount(common.TransactionCase):
+
+    def setUp(self):
+        super(TestBudgetQueryCount, self).setUp()
+        self.data = BudgetBenchmarkData(self.env)
+        self.positions = self.data.create_positions(2)
+        self.analytic_account = self.data.create_analytic_accounts(1)
+        self.data.create_moves(self.positions, self.analytic_account, 10)
+
+    def _create_budget(self, line_count):
+        budget = self.env['crossovered.budget'].create({
+            'name': 'Query Count Budget',
+            'date_from': self.data.date_from,
+            'date_to': self.data.date_to,
+        })
+        self.env['crossovered.budget.lines'].create([{
+            'crossovered_budget_id': budget.id,
+            'general_budget_id': self.positions[index % 2].id,
+            'analytic_account_id': index % 4 < 2 and self.analytic_account.id,
+            'date_from': self.data.date_from,
+            'date_to': self.data.date_to,
+            'planned_amount': 1000.0,
+        } for index in range(line_count)])
+        return budget
+
+    def _count_queries(self, lines):
+        # Warm up the caches shared between transactions first
+        lines.read(AMOUNT_FIELDS)
+        lines.invalidate_cache()
+        count = self.cr.sql_log_count
+        lines.read(AMOUNT_FIELDS)
+        return self.cr.sql_log_count - count
+
+    def test_budget_form_query_count(self):
+        counts = []
+        for line_count in (10, 100, 1000):
+            budget = self._create_budget(line_count)
+            lines = budget.crossovered_budget_line_ids
+            self.assertEqual(len(lines), line_count)
+            counts.append(self._count_queries(lines))
+        self.assertLessEqual(counts[0], MAX_QUERIES)
+        self.assertEqual(
+            counts, [counts[0]] * 3,
+            'The queries must not grow with the number of lines')
+
+    def test_analytic_account_query_count(self):
+        counts = []
+        for line_count in (10, 100, 1000):
+            analytic_account = self.data.create_analytic_accounts(1)
+            budget = self._create_budget(line_count)
+            budget.crossovered_budget_line_ids.write({
+                'analytic_account_id': analytic_account.id,
+            })
+            lines = analytic_account.crossovered_budget_line_ids
+            self.assertEqual(len(lines), line_count)
+            counts.append(self._count_queries(lines))
+        self.assertLessEqual(counts[0], MAX_QUERIES)
+        self.assertEqual(
+            counts, [counts[0]] * 3,
+            'The queries must not grow with the number of lines')
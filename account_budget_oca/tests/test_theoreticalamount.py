@@ -108,6 +108,43 @@ class TestTheoreticalAmount(TestAccountBudgetCommon):
         self.mock_datetime.now.return_value = date
         self.assertAlmostEqual(self.line.theoretical_amount, -364)
 
+    def test_11(self):
+        """Paid lines and batches"""
+        date = Datetime.to_string(Datetime.from_string('2014-07-02 00:00:00'))
+        self.mock_datetime.now.return_value = date
+        paid_after = self.line.copy({'paid_date': '2015-01-15'})
+        paid_before = self.line.copy({'paid_date': '2014-06-30'})
+        lines = self.line | paid_after | paid_before
+        self.mock_datetime.now.reset_mock()
+        self.assertEqual(
+            lines.mapped('theoretical_amount'), [-182, 0, -364])
+        self.assertEqual(self.mock_datetime.now.call_count, 1)
+
+    def test_12(self):
+        """Seasonal spread profile"""
+        profile = self.env['account.budget.spread.profile'].create({
+            'name': 'First Half',
+            'weight_ids': [(0, 0, {'period': period, 'weight': 1.0})
+                           for period in range(1, 7)],
+        })
+        self.line.general_budget_id.spread_profile_id = profile
+        date = Datetime.to_string(Datetime.from_string('2014-04-01 00:00:00'))
+        self.mock_datetime.now.return_value = date
+        self.assertAlmostEqual(self.line.theoretical_amount, -182)
+        self.line.invalidate_cache()
+        date = Datetime.to_string(Datetime.from_string('2014-07-01 00:00:00'))
+        self.mock_datetime.now.return_value = date
+        self.assertAlmostEqual(self.line.theoretical_amount, -364)
+        # The profile of the line has precedence
+        self.line.spread_profile_id = self.env[
+            'account.budget.spread.profile'].create({
+                'name': 'Second Half',
+                'weight_ids': [(0, 0, {'period': period, 'weight': 1.0})
+                               for period in range(7, 13)],
+            })
+        self.line.invalidate_cache()
+        self.assertAlmostEqual(self.line.theoretical_amount, 0)
+
     def tearDown(self):
         self.patcher.stop()
         super(TestTheoreticalAmount, self).tearDown()
@@ -0,0 +1,201 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import base64
+import csv
+import io
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Number of CSV rows validated and written together
+_CHUNK_SIZE = 10000
+
+# Number of errors listed when the file is rejected
+_MAX_ERRORS = 20
+
+_REQUIRED_COLUMNS = {
+    'general_budget_id', 'date_from', 'date_to', 'planned_amount',
+}
+
+# Existing lines of the budget matching the rows of a VALUES list
+_MATCH_LINES_QUERY = """
+    SELECT line.key, bl.id
+    FROM (VALUES %s) AS line(
+        key, general_budget_id, analytic_account_id, date_from, date_to)
+    JOIN crossovered_budget_lines bl
+        ON bl.crossovered_budget_id = %%s
+        AND bl.general_budget_id = line.general_budget_id
+        AND bl.analytic_account_id IS NOT DISTINCT FROM
+            line.analytic_account_id
+        AND bl.date_from = line.date_from
+        AND bl.date_to = line.date_to"""
+
+_MATCH_LINES_ROW = '(%s, %s::integer, %s::integer, %s::date, %s::date)'
+
+
+class CrossoveredBudgetLinesImport(models.TransientModel):
+    _name = 'crossovered.budget.lines.import'
+    _description = 'Import Budget Lines'
+
+    budget_id = fields.Many2one(
+        comodel_name='crossovered.budget', string='Budget', required=True,
+        ondelete='cascade', default=lambda self: self._default_budget_id())
+    data_file = fields.Binary(string='File', required=True)
+    filename = fields.Char()
+    delimiter = fields.Char(default=',', required=True, size=1)
+    update_existing = fields.Boolean(
+        string='Update Existing Lines', default=True,
+        help='Update the planned amount of the lines of the budget having '
+             'the same budgetary position, analytic account and dates as a '
+             'row of the file, instead of creating another line.')
+
+    @api.model
+    def _default_budget_id(self):
+        if self.env.context.get('active_model') == 'crossovered.budget':
+            return self.env.context.get('active_id')
+        return False
+
+    @api.multi
+    def _get_lookups(self):
+        """Map the labels used in the file to record ids, once for the
+        whole file: budgetary positions by name, analytic accounts by
+        reference or name. Labels shared by several records map to None.
+        """
+        self.ensure_one()
+        company_domain = [
+            ('company_id', 'in', [self.budget_id.company_id.id, False])]
+        posts = {}
+        for post in self.env['account.budget.post'].search_read(
+                company_domain, ['name']):
+            name = post['name']
+            posts[name] = None if name in posts else post['id']
+        analytic_accounts = {}
+        for account in self.env['account.analytic.account'].search_read(
+                company_domain, ['name', 'code']):
+            for label in {account['name'], account['code']} - {False}:
+                analytic_accounts[label] = (
+                    None if label in analytic_accounts else account['id'])
+        return posts, analytic_accounts
+
+    @api.model
+    def _parse_row(self, row, lookups):
+        """Return the values of a budget line from a row of the file.
+
+        :raise ValueError: when a value of the row is not valid
+        """
+        posts, analytic_accounts = lookups
+        vals = {}
+        for column, lookup, label in (
+                ('general_budget_id', posts, _('budgetary position')),
+                ('analytic_account_id', analytic_accounts,
+                 _('analytic account'))):
+            value = (row.get(column) or '').strip()
+            if not value:
+                vals[column] = False
+                continue
+            if value not in lookup:
+                raise ValueError(_('Unknown %s "%s"') % (label, value))
+            if lookup[value] is None:
+                raise ValueError(_('Ambiguous %s "%s"') % (label, value))
+            vals[column] = lookup[value]
+        if not vals['general_budget_id']:
+            raise ValueError(_('Missing budgetary position'))
+        for column in ('date_from', 'date_to', 'paid_date'):
+            value = (row.get(column) or '').strip()
+            vals[column] = value and fields.Date.from_string(value)
+        if not vals['date_from'] or not vals['date_to']:
+            raise ValueError(_('Missing dates'))
+        if vals['date_from'] > vals['date_to']:
+            raise ValueError(_('The start date is after the end date'))
+        vals['planned_amount'] = float(row['planned_amount'] or 0.0)
+        return vals
+
+    @api.multi
+    def _match_lines(self, vals_list):
+        """Return the ids of the existing lines of the budget matching the
+        values, by position in ``vals_list``, with one query per chunk.
+        """
+        self.ensure_one()
+        matches = {}
+        for offset, chunk in enumerate(split_every(
+                self.env.cr.IN_MAX, vals_list)):
+            params = []
+            for key, vals in enumerate(chunk, offset * self.env.cr.IN_MAX):
+                params.extend([
+                    key, vals['general_budget_id'],
+                    vals['analytic_account_id'] or None, vals['date_from'],
+                    vals['date_to']])
+            self.env.cr.execute(_MATCH_LINES_QUERY % ', '.join(
+                [_MATCH_LINES_ROW] * len(chunk)),
+                params + [self.budget_id.id])
+            matches.update(self.env.cr.fetchall())
+        return matches
+
+    @api.multi
+    def _write_lines(self, vals_list):
+        """Create the lines of a validated chunk, or update the planned
+        amount of the existing ones.
+
+        :return: number of created lines, number of updated lines
+        """
+        self.ensure_one()
+        budget_line_obj = self.env['crossovered.budget.lines']
+        matches = self.update_existing and self._match_lines(vals_list) or {}
+        budget_line_obj._bulk_update(
+            ['planned_amount'],
+            [(line_id, vals_list[key]['planned_amount'])
+             for key, line_id in matches.items()])
+        budget_line_obj._bulk_create([
+            dict(vals, crossovered_budget_id=self.budget_id.id)
+            for key, vals in enumerate(vals_list) if key not in matches])
+        return len(vals_list) - len(matches), len(matches)
+
+    @api.multi
+    def action_import(self):
+        self.ensure_one()
+        if self.budget_id.state != 'draft':
+            raise UserError(_('Lines can only be imported in draft budgets.'))
+        stream = io.TextIOWrapper(
+            io.BytesIO(base64.b64decode(self.data_file)),
+            encoding='utf-8-sig')
+        reader = csv.DictReader(stream, delimiter=str(self.delimiter))
+        missing = _REQUIRED_COLUMNS - set(reader.fieldnames or [])
+        if missing:
+            raise UserError(_('Missing columns in the file: %s') % ', '.join(
+                sorted(missing)))
+        lookups = self._get_lookups()
+        errors = []
+        created = updated = 0
+        # The header is the first line of the file
+        for chunk in split_every(_CHUNK_SIZE, enumerate(reader, 2)):
+            vals_list = []
+            for line_number, row in chunk:
+                try:
+                    vals_list.append(self._parse_row(row, lookups))
+                except ValueError as error:
+                    errors.append(_('Line %s: %s') % (line_number, error))
+            if errors:
+                # Keep validating to report the errors of the whole file,
+                # nothing is written anymore
+                continue
+            chunk_created, chunk_updated = self._write_lines(vals_list)
+            created += chunk_created
+            updated += chunk_updated
+            _logger.info('Imported %s budget lines in budget %s',
+                         created + updated, self.budget_id.name)
+        if errors:
+            message = '\n'.join(errors[:_MAX_ERRORS])
+            if len(errors) > _MAX_ERRORS:
+                message += '\n' + _('... and %s more errors') % (
+                    len(errors) - _MAX_ERRORS)
+            raise UserError(message)
+        self.budget_id.message_post(body=_(
+            '%s budget lines imported, %s updated.') % (created, updated))
+        action = self.env.ref(
+            'account_budget_oca.act_crossovered_budget_lines_view').read()[0]
+        action['domain'] = [('crossovered_budget_id', '=', self.budget_id.id)]
+        return action
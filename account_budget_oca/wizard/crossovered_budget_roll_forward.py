@@ -0,0 +1,39 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+
+class CrossoveredBudgetRollForward(models.TransientModel):
+    _name = 'crossovered.budget.roll.forward'
+    _description = 'Roll Budgets Forward'
+
+    budget_ids = fields.Many2many(
+        comodel_name='crossovered.budget', string='Budgets', required=True,
+        default=lambda self: self._default_budget_ids())
+    months = fields.Integer(
+        string='Offset (Months)', default=12, required=True,
+        help='Number of months the dates of the budgets and of their lines '
+             'are moved by.')
+    factor = fields.Float(
+        string='Planned Amounts Factor', default=1.0, required=True,
+        help='Factor applied to the planned amounts, e.g. 1.05 for a 5% '
+             'increase.')
+
+    @api.model
+    def _default_budget_ids(self):
+        if self.env.context.get('active_model') == 'crossovered.budget':
+            return [(6, 0, self.env.context.get('active_ids', []))]
+        return False
+
+    @api.multi
+    def action_roll_forward(self):
+        self.ensure_one()
+        if not self.months:
+            raise UserError(_('The offset must not be zero.'))
+        new_budgets = self.budget_ids._roll_forward(
+            months=self.months, factor=self.factor)
+        action = self.env.ref(
+            'account_budget_oca.act_crossovered_budget_view').read()[0]
+        action['domain'] = [('id', 'in', new_budgets.ids)]
+        return action
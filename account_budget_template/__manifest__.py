@@ -17,6 +17,7 @@
         "views/crossovered_budget_template_view.xml",
         "views/crossovered_budget_view.xml",
         "views/res_config_settings_view.xml",
+        "views/crossovered_budget_generate_view.xml",
     ],
     "installable": True,
 }
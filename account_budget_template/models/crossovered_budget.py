@@ -5,6 +5,7 @@ from ast import literal_eval
 from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models
+from odoo.addons.account_budget_oca.models.budget_profiling import profiled
 
 to_date = fields.Date.to_date
 to_string = fields.Date.to_string
@@ -32,43 +33,44 @@ class CrossoveredBudget(models.Model):
 
     @api.multi
     def button_compute_lines(self):
-        for budget in self.filtered('budget_tmpl_id'):
-            budget.action_create_period()
+        self.filtered('budget_tmpl_id').action_create_period()
 
+    @api.multi
+    def _prepare_period_line_vals(self):
+        """Return the values of the budget lines to create: one per period
+        of the template periodicity and per budgetary position.
+        """
+        self.ensure_one()
+        budget_posts = self.budget_tmpl_id.budget_post_ids
+        date_from = to_date(self.date_from)
+        date_to = to_date(self.date_to)
+        periods = []
+        if not self.budget_tmpl_id.periodicity:
+            periods.append((date_from, date_to))
+        else:
+            periodicity_months = (
+                _periodicityMonths[self.budget_tmpl_id.periodicity])
+            ds = date_from
+            while ds < date_to:
+                de = ds + relativedelta(months=periodicity_months, days=-1)
+                periods.append((ds, min(de, date_to)))
+                ds = ds + relativedelta(months=periodicity_months)
+        return [{
+            'crossovered_budget_id': self.id,
+            'planned_amount': 0.0,
+            'date_from': to_string(ds),
+            'date_to': to_string(de),
+            'general_budget_id': budget_post.id,
+            'spread_profile_id': self.budget_tmpl_id.spread_profile_id.id,
+        } for ds, de in periods for budget_post in budget_posts]
+
+    @profiled('create_period')
     def action_create_period(self):
-        budget_line_obj = self.env['crossovered.budget.lines']
+        vals_list = []
         for budget in self.filtered(
                 lambda b: not b.crossovered_budget_line_ids and
                 b.state == 'draft'):
-            budget_posts = budget.budget_tmpl_id.budget_post_ids
-            periodicity_months = False
-            if budget.budget_tmpl_id.periodicity:
-                periodicity_months = (
-                    _periodicityMonths[budget.budget_tmpl_id.periodicity])
-            vals = {
-                'crossovered_budget_id': budget.id,
-                'planned_amount': 0.0,
-            }
-            if not periodicity_months:
-                for budget_post in budget_posts:
-                    vals.update({
-                        'date_from': budget.date_from,
-                        'date_to': budget.date_to,
-                        'general_budget_id': budget_post.id,
-                    })
-                    budget_line_obj.create(vals)
-            else:
-                ds = to_date(budget.date_from)
-                while ds < to_date(budget.date_to):
-                    de = ds + relativedelta(months=periodicity_months, days=-1)
-                    if de > to_date(budget.date_to):
-                        de = to_date(budget.date_to)
-                    for budget_post in budget_posts:
-                        vals.update({
-                            'date_from': to_string(ds),
-                            'date_to': to_string(de),
-                            'general_budget_id': budget_post.id,
-                        })
-                        budget_line_obj.create(vals)
-                    ds = ds + relativedelta(months=periodicity_months)
+            vals_list.extend(budget._prepare_period_line_vals())
+        # A single batched creation for all the budgets
+        self.env['crossovered.budget.lines'].create(vals_list)
         return True
@@ -21,6 +21,11 @@ class CrossoveredBudgetTemplate(models.Model):
                    ('sixmonthly', 'Six-monthly'),
                    ('yearly', 'Yearly')],
         default='monthly', string='Periodicity')
+    spread_profile_id = fields.Many2one(
+        comodel_name='account.budget.spread.profile', string='Spread Profile',
+        help='Spread profile of the budget lines generated from the '
+             'template. Without it, the lines use the profile of their '
+             'budgetary position.')
 
     def _check_budget_post_ids(self, vals):
         # Raise an error to prevent the account.budget.template to have not
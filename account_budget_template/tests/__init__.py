@@ -2,3 +2,4 @@
 # License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
 
 from . import test_account_budget_template
+from . import test_benchmark
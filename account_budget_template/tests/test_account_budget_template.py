@@ -78,6 +78,64 @@ class TestAccountBudgetTemplate(common.SavepointCase):
             len(self.budget.crossovered_budget_line_ids),
             len(self.budget_tmpl.budget_post_ids))
 
+    def test_template_several_budgets(self):
+        budgets = self.budget | self.budget.copy({'name': 'Other Budget'})
+        budgets.button_compute_lines()
+        for budget in budgets:
+            lines = budget.crossovered_budget_line_ids
+            self.assertEqual(len(lines), 12)
+            self.assertEqual(
+                min(lines.mapped('date_from')), budget.date_from)
+            self.assertEqual(max(lines.mapped('date_to')), budget.date_to)
+
+    def test_generate_budgets(self):
+        analytic_accounts = self.env['account.analytic.account'].create([
+            {'name': 'Budget Generation %s' % index} for index in range(3)])
+        wizard = self.env['crossovered.budget.generate'].create({
+            'budget_tmpl_id': self.budget_tmpl.id,
+            'date_from': self.budget.date_from,
+            'date_to': self.budget.date_to,
+            'analytic_account_domain': str(
+                [('name', '=like', 'Budget Generation %')]),
+        })
+        action = wizard.action_generate()
+        budgets = self.env['crossovered.budget'].search(action['domain'])
+        self.assertEqual(len(budgets), 3)
+        for budget in budgets:
+            self.assertEqual(budget.budget_tmpl_id, self.budget_tmpl)
+            lines = budget.crossovered_budget_line_ids
+            self.assertEqual(len(lines), 12)
+            self.assertEqual(len(lines.mapped('analytic_account_id')), 1)
+            self.assertEqual(lines.mapped('company_id'), budget.company_id)
+        self.assertEqual(
+            budgets.mapped(
+                'crossovered_budget_line_ids.analytic_account_id'),
+            analytic_accounts)
+
+    def test_template_spread_profile(self):
+        profile = self.env['account.budget.spread.profile'].create({
+            'name': 'Test Profile',
+            'weight_ids': [(0, 0, {'period': period, 'weight': period})
+                           for period in range(1, 13)],
+        })
+        self.budget_tmpl.spread_profile_id = profile
+        self.budget.button_compute_lines()
+        lines = self.budget.crossovered_budget_line_ids
+        self.assertEqual(lines.mapped('spread_profile_id'), profile)
+        wizard = self.env['crossovered.budget.generate'].create({
+            'budget_tmpl_id': self.budget_tmpl.id,
+            'date_from': self.budget.date_from,
+            'date_to': self.budget.date_to,
+            'analytic_account_domain': str([('id', '=', self.env[
+                'account.analytic.account'].create({
+                    'name': 'Budget Spread Profile'}).id)]),
+        })
+        budgets = self.env['crossovered.budget'].search(
+            wizard.action_generate()['domain'])
+        self.assertEqual(
+            budgets.mapped('crossovered_budget_line_ids.spread_profile_id'),
+            profile)
+
     def test_res_config(self):
         self.assertFalse(
             self.setting.budget_templ_id)
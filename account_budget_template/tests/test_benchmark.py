@@ -0,0 +1,49 @@
+# Copyright 2018 Oihane Crucelaegui - AvanzOSC
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+from odoo.tests import common, tagged
+
+from odoo.addons.account_budget_oca.tests.benchmark import (
+    BudgetBenchmarkData, BudgetBenchmarkRecorder)
+
+# (budgets, budgetary positions)
+SCENARIOS = [(1, 10), (10, 50), (20, 300)]
+
+
+@tagged('post_install', '-at_install', '-standard', 'budget_benchmark')
+class TestBudgetTemplateBenchmark(common.TransactionCase):
+
+    def setUp(self):
+        super(TestBudgetTemplateBenchmark, self).setUp()
+        self.recorder = BudgetBenchmarkRecorder(
+            self.cr, 'account_budget_template')
+
+    def tearDown(self):
+        self.recorder.dump()
+        super(TestBudgetTemplateBenchmark, self).tearDown()
+
+    def test_benchmark_create_period(self):
+        data = BudgetBenchmarkData(self.env)
+        for budget_count, position_count in SCENARIOS:
+            positions = data.create_positions(position_count, 1)
+            for periodicity in ('monthly', 'quaterly', 'yearly', False):
+                template = self.env['crossovered.budget.template'].create({
+                    'name': 'Benchmark Template',
+                    'budget_post_ids': [(6, 0, positions.ids)],
+                    'periodicity': periodicity,
+                })
+                budgets = self.env['crossovered.budget'].with_context(
+                    tracking_disable=True).create([{
+                        'name': 'Benchmark Budget',
+                        'budget_tmpl_id': template.id,
+                        'date_from': data.date_from,
+                        'date_to': data.date_to,
+                    } for dummy in range(budget_count)])
+                with self.recorder.measure(
+                        'action_create_period', budgets=budget_count,
+                        positions=position_count,
+                        periodicity=periodicity or 'none'):
+                    budgets.action_create_period()
+                self.assertTrue(all(
+                    budget.crossovered_budget_line_ids
+                    for budget in budgets))
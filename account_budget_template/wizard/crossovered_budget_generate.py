@@ -0,0 +1,75 @@
+# Copyright 2018 Oihane Crucelaegui - AvanzOSC
+# License AGPL-3 - See http://www.gnu.org/licenses/agpl-3.0.html
+
+import logging
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+# Number of budget lines inserted per statement batch
+_CHUNK_SIZE = 10000
+
+
+class CrossoveredBudgetGenerate(models.TransientModel):
+    _name = 'crossovered.budget.generate'
+    _description = 'Generate Budgets from Template'
+
+    budget_tmpl_id = fields.Many2one(
+        comodel_name='crossovered.budget.template', string='Template',
+        required=True)
+    date_from = fields.Date(string='Start Date', required=True)
+    date_to = fields.Date(string='End Date', required=True)
+    analytic_account_domain = fields.Char(
+        string='Analytic Accounts', default='[]', required=True,
+        help='One budget is generated for each analytic account matching '
+             'this domain.')
+
+    @api.multi
+    def _prepare_budget_vals(self, analytic_account):
+        self.ensure_one()
+        return {
+            'name': '%s - %s' % (
+                self.budget_tmpl_id.name, analytic_account.display_name),
+            'budget_tmpl_id': self.budget_tmpl_id.id,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+        }
+
+    @api.multi
+    def action_generate(self):
+        self.ensure_one()
+        analytic_accounts = self.env['account.analytic.account'].search(
+            safe_eval(self.analytic_account_domain))
+        if not analytic_accounts:
+            raise UserError(_('No analytic account matches the domain.'))
+        budgets = self.env['crossovered.budget'].with_context(
+            tracking_disable=True).create([
+                self._prepare_budget_vals(analytic_account)
+                for analytic_account in analytic_accounts])
+        # The periods are the same for every budget
+        period_vals = budgets[:1]._prepare_period_line_vals()
+        total = len(period_vals) * len(budgets)
+        _logger.info('Generating %s budgets with %s lines from template %s',
+                     len(budgets), total, self.budget_tmpl_id.name)
+        budget_line_obj = self.env['crossovered.budget.lines']
+        vals_list = []
+        done = 0
+        for budget, analytic_account in zip(budgets, analytic_accounts):
+            vals_list.extend(
+                dict(vals, crossovered_budget_id=budget.id,
+                     analytic_account_id=analytic_account.id)
+                for vals in period_vals)
+            if len(vals_list) >= _CHUNK_SIZE:
+                budget_line_obj._bulk_create(vals_list)
+                done += len(vals_list)
+                vals_list = []
+                _logger.info('Generated %s/%s budget lines', done, total)
+        budget_line_obj._bulk_create(vals_list)
+        _logger.info('Generated %s/%s budget lines', total, total)
+        action = self.env.ref(
+            'account_budget_oca.act_crossovered_budget_view').read()[0]
+        action['domain'] = [('id', 'in', budgets.ids)]
+        return action